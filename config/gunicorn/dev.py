@@ -1,4 +1,12 @@
 """Gunicorn *development* config file"""
+import os
+
+# Workers share cache versions (questions.caching), a per-process cache
+# would serve stale pages and search results: default to files
+os.environ.setdefault(
+    "DJANGO_CACHE_BACKEND",
+    "django.core.cache.backends.filebased.FileBasedCache")
+os.environ.setdefault("DJANGO_CACHE_LOCATION", "./misc/cache")
 
 # Django WSGI application path in pattern MODULE_NAME:VARIABLE_NAME
 wsgi_app = "hasker.wsgi:application"
@@ -18,3 +26,15 @@ capture_output = True
 pidfile = "./misc/dev.pid"
 # Daemonize the Gunicorn process (detach & enter background)
 daemon = True
+
+
+def on_starting(server):
+    """Refuse to run several workers with a per-process cache"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hasker.settings")
+    from django.conf import settings
+
+    backend = settings.CACHES["default"]["BACKEND"]
+    if server.cfg.workers > 1 and backend.endswith(".LocMemCache"):
+        raise RuntimeError(
+            f"{server.cfg.workers} workers can't share {backend}, "
+            "set DJANGO_CACHE_BACKEND to a shared cache")
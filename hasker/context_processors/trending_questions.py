@@ -1,7 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+
 from questions.models import Question
 
 
 def get_trends(request):
+    # evaluated only if a template really uses trending questions
     return {
-        'trending': Question.trending()
+        'trending': SimpleLazyObject(Question.cached_trending)
     }
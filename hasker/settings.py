@@ -92,6 +92,26 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Local memory cache is per process: point it to a shared cache
+# (memcached, redis, files) when running several workers. Versions of
+# cached data (questions.caching) are bumped by the workers and by
+# management commands such as recompute_hot_scores, all of them must
+# use the same cache. config/gunicorn/dev.py defaults to files and
+# refuses to start several workers with local memory
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'DJANGO_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -158,4 +178,50 @@ LOGIN_REDIRECT_URL = '/users/profile'
 LOGIN_URL = '/users/login'
 
 ELEMENTS_PER_PAGE = 20
+ANSWERS_PER_PAGE = 30
 TRENDING_QUESTIONS_NUMBER = 20
+TRENDING_CACHE_TTL = 60 * 10  # invalidated by votes, TTL is a safety net
+# pages of anonymous visitors, see questions.page_cache; invalidated by
+# writes, the TTL bounds how long "asked ... ago" dates may lag behind
+PAGE_CACHE_TTL = 60 * 10
+# write-behind vote counters for voting spikes, see questions.votes
+VOTE_BUFFER = os.environ.get('DJANGO_VOTE_BUFFER', 'False') == 'True'
+VOTE_FLUSH_INTERVAL = 200   # milliseconds
+# progress of an interrupted reconcile_votes run, see its --resume
+VOTE_RECONCILE_CHECKPOINT = os.environ.get(
+    'DJANGO_VOTE_RECONCILE_CHECKPOINT',
+    BASE_DIR / 'misc' / 'reconcile_votes.json')
+
+# hot questions ranking, see questions.ranking
+HOT_SCORE_GRAVITY = 1.8
+HOT_SCORE_ANSWER_WEIGHT = 2
+HOT_SCORE_DECAY_WINDOW = 500
+# exact COUNT(*) is used for results smaller than that
+PAGINATOR_ESTIMATE_THRESHOLD = 10000
+PAGINATOR_COUNT_CACHE_TTL = 60  # seconds
+
+# search engine, see questions.search.get_backend(); None to pick
+# PostgreSQL full-text search or the plain database search by vendor.
+# 'questions.search.memory.MemoryBackend' is an in-process BM25 index
+SEARCH_BACKEND = os.environ.get('DJANGO_SEARCH_BACKEND') or None
+# snapshot of the in-process index, see rebuild_search_index command
+SEARCH_INDEX_PATH = os.environ.get(
+    'DJANGO_SEARCH_INDEX_PATH', BASE_DIR / 'misc' / 'search_index.bin')
+SEARCH_MAX_RESULTS = 1000
+# minimal share of similar trigrams for typo tolerant title search,
+# also used as pg_trgm.word_similarity_threshold. Two typos in a short
+# word ("djnago orm") score below 0.5
+SEARCH_FUZZY_CUTOFF = 0.4
+# per-process LRU of search results, invalidated by content writes
+SEARCH_CACHE_SIZE = 500
+SEARCH_CACHE_TTL = 60 * 5
+# question ids of every tag for tag queries, invalidated on changes
+TAG_POSTINGS_CACHE_TTL = 60 * 60
+# max number of questions and of tags returned by questions:suggest
+SUGGEST_LIMIT = 10
+# tag suggestions on the ask form, see build_tag_model command
+TAG_MODEL_PATH = os.environ.get(
+    'DJANGO_TAG_MODEL_PATH', BASE_DIR / 'misc' / 'tag_model.bin')
+TAG_SUGGEST_LIMIT = 5
+# PostgreSQL text search configuration used by questions.search
+SEARCH_CONFIG = 'english'
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hasker.settings')
 
 application = get_wsgi_application()
+
+# search-as-you-type index is built at startup, not in the first request
+from django.db import connections  # noqa E402
+from questions.search.suggest import suggestions  # noqa E402
+
+suggestions.warm()
+connections.close_all()     # not to share it with forked workers
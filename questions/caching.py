@@ -0,0 +1,42 @@
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(name):
+    return f'version:{name}'
+
+
+def _initial_version():
+    # versions start from a timestamp, so a version evicted from the
+    # cache never comes back with a value that was used before
+    return time.time_ns() // 1000000
+
+
+def get_version(name) -> int:
+    """
+    Return current version of a cached namespace (e.g. 'trending').
+    Cache keys built with versioned_key() become unreachable as soon
+    as the version is bumped, so no explicit deletion is needed.
+    """
+    version = cache.get(_version_key(name))
+    if version is None:
+        cache.add(_version_key(name), _initial_version(), timeout=None)
+        version = cache.get(_version_key(name))
+    return version
+
+
+def bump_version(name) -> int:
+    """
+    Invalidate everything cached under the namespace.
+    """
+    try:
+        return cache.incr(_version_key(name))
+    except ValueError:   # version was evicted
+        cache.add(_version_key(name), _initial_version(), timeout=None)
+        return cache.get(_version_key(name))
+
+
+def versioned_key(name, *parts) -> str:
+    suffix = ':'.join(str(part) for part in parts)
+    return f'{name}:v{get_version(name)}:{suffix}'
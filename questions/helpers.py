@@ -1,5 +1,4 @@
 from datetime import datetime, timezone
-from django.core.exceptions import ObjectDoesNotExist
 
 
 def get_time_diff(thetime) -> str:
@@ -26,17 +25,25 @@ def get_time_diff(thetime) -> str:
 
 
 def save_tags(tags: list, question, tag_model):
-    if not tags:
+    """
+    Attach tags to a question, creating the missing ones. Tags are
+    resolved with one query and created with another, which tolerates
+    the same tag being created concurrently. All the through rows are
+    inserted in one batch. Call it within the transaction that saves
+    the question.
+    """
+    titles = list(dict.fromkeys(tag.strip() for tag in tags or ()))
+    titles = [title for title in titles if title]
+    if not titles:
         return
-    for tag in tags:
-        tag = tag.strip()
-        try:
-            old_tag = tag_model.objects.get(title=tag)
-        except ObjectDoesNotExist:
-            pass
-        else:
-            old_tag.questions.add(question)
-            continue
-        t = tag_model.objects.create(title=tag)
-        t.questions.add(question)
-        t.save()
+    found = dict(tag_model.objects.filter(
+        title__in=titles).values_list('title', 'id'))
+    missing = [title for title in titles if title not in found]
+    if missing:
+        tag_model.objects.bulk_create(
+            [tag_model(title=title) for title in missing],
+            ignore_conflicts=True
+        )
+        found.update(tag_model.objects.filter(
+            title__in=missing).values_list('title', 'id'))
+    question.tag_set.add(*found.values())
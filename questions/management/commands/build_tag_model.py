@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from questions.search.tag_suggest import build_tag_model
+
+
+class Command(BaseCommand):
+    help = ('Count tag co-occurrences and title term to tag associations '
+            'for tag suggestions on the ask form. Meant to be run '
+            'periodically (e.g. by cron), workers pick the new snapshot up')
+
+    def handle(self, *args, **options):
+        used = build_tag_model(settings.TAG_MODEL_PATH)
+        self.stdout.write(f'Tag model built from {used} question(s)')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from questions.models import Question
+
+
+class Command(BaseCommand):
+    help = ('Recount denormalized answer_count and last_activity '
+            'of questions in batches')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Number of question ids updated in one statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = Question.objects.aggregate(last=Max('id'))['last'] or 0
+        updated = 0
+        for start in range(0, last_id, batch_size):
+            with transaction.atomic():
+                updated += Question.objects.filter(
+                    id__gt=start, id__lte=start + batch_size
+                ).rebuild_counters()
+        self.stdout.write(f'Counters rebuilt for {updated} question(s)')
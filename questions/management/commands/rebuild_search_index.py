@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from questions.search import get_backend
+
+
+class Command(BaseCommand):
+    help = ('Reindex all the questions with the configured search backend. '
+            'The in-process backend also writes its snapshot file, which '
+            'is then mapped by the workers on start')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.rebuild()
+        self.stdout.write(f'Search index rebuilt ({type(backend).__name__})')
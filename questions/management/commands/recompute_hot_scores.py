@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from questions.ranking import recompute_hot_scores
+
+
+class Command(BaseCommand):
+    help = ('Rescore questions touched since the last run and re-decay '
+            'the top ones. Meant to be run periodically (e.g. by cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window', type=int, default=None,
+            help='Number of top questions re-decayed on every run')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of questions updated in one statement')
+
+    def handle(self, *args, **options):
+        rescored = recompute_hot_scores(window=options['window'],
+                                        batch_size=options['batch_size'])
+        self.stdout.write(f'Hot score recomputed for {rescored} question(s)')
@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from questions.models import Answer, AnswerVote, Question, QuestionVote
+from questions.votes import add_votes
+
+TARGETS = (
+    (Question, QuestionVote, 'question'),
+    (Answer, AnswerVote, 'answer'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Recount votes of questions and answers from the vote tables '
+            'in small chunks and delete vote rows without a vote. Meant '
+            'to run on the live database, see --sleep and --resume')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of objects checked in one chunk')
+        parser.add_argument(
+            '--sleep', type=float, default=0.1,
+            help='Pause between chunks, in seconds')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Continue after the last chunk of an interrupted run, '
+                 'see settings.VOTE_RECONCILE_CHECKPOINT')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report mismatches without fixing anything')
+
+    def handle(self, *args, **options):
+        path = settings.VOTE_RECONCILE_CHECKPOINT
+        self.progress = read_checkpoint(path) if options['resume'] else {}
+        for model, vote_model, target in TARGETS:
+            try:
+                fixed, deleted = self.reconcile(model, vote_model, target,
+                                                options)
+            except KeyboardInterrupt:
+                last_id = self.progress.get(target, 0)
+                hint = ('' if options['dry_run'] else
+                        ', run again with --resume to continue')
+                raise CommandError(
+                    f'Interrupted: {model._meta.verbose_name_plural} '
+                    f'checked up to id {last_id}{hint}')
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural.capitalize()}: '
+                f'{fixed} counter(s) fixed, {deleted} empty vote(s) deleted')
+        if not options['dry_run'] and os.path.exists(path):
+            os.unlink(path)
+
+    def reconcile(self, model, vote_model, target, options):
+        """
+        Walk the objects in chunks of increasing id. For every chunk the
+        counters and the sums of the vote rows are read with a single
+        statement and mismatched counters are corrected by the
+        difference, so votes cast meanwhile are not overwritten.
+        The last checked id is written to the checkpoint file after
+        every chunk, a run is resumed from there.
+        Deltas still buffered by workers (settings.VOTE_BUFFER) are
+        counted twice once flushed, the next run corrects that.
+        """
+        last_id = self.progress.get(target, 0)
+        totals = vote_model.objects.filter(
+            **{target: OuterRef('pk')}).order_by().values(target).annotate(
+            total=Sum('vote')).values('total')
+        objects = model.objects.order_by('pk').annotate(
+            true_votes=Coalesce(Subquery(totals), 0)).values_list(
+            'pk', 'votes', 'true_votes')
+        fixed = deleted = 0
+        while True:
+            rows = list(
+                objects.filter(pk__gt=last_id)[:options['batch_size']])
+            if not rows:
+                break
+            first_id, last_id = rows[0][0], rows[-1][0]
+            deltas = defaultdict(list)
+            for pk, votes, true_votes in rows:
+                if votes != true_votes:
+                    deltas[true_votes - votes].append(pk)
+            fixed += sum(len(pks) for pks in deltas.values())
+            empty = vote_model.objects.filter(**{
+                f'{target}__gte': first_id, f'{target}__lte': last_id,
+            }, vote=0)
+            if options['dry_run']:
+                deleted += empty.count()
+            else:
+                with transaction.atomic():
+                    for delta, pks in deltas.items():
+                        add_votes(model, delta, pks)
+                    deleted += empty.delete()[0]
+            self.progress[target] = last_id
+            if not options['dry_run']:
+                write_checkpoint(settings.VOTE_RECONCILE_CHECKPOINT,
+                                 self.progress)
+            if options['sleep']:
+                time.sleep(options['sleep'])    # leave room for the site
+        return fixed, deleted
+
+
+def read_checkpoint(path) -> dict:
+    """
+    Last checked ids by target, empty if there is no usable checkpoint.
+    """
+    try:
+        with open(path) as f:
+            progress = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(progress, dict):
+        return {}
+    return {target: last_id for target, last_id in progress.items()
+            if type(last_id) is int}
+
+
+def write_checkpoint(path, progress: dict):
+    """
+    Atomically replace the checkpoint, an interrupted write leaves the
+    previous one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(progress, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
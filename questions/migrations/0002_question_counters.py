@@ -0,0 +1,41 @@
+# Generated by Django 4.0.2 on 2026-10-17 22:55
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+
+def fill_counters(apps, schema_editor):
+    Question = apps.get_model('questions', 'Question')
+    Answer = apps.get_model('questions', 'Answer')
+    answers = Answer.objects.filter(
+        question=OuterRef('pk')).order_by().values('question')
+    Question.objects.update(
+        answer_count=Coalesce(
+            Subquery(answers.annotate(n=Count('pk')).values('n')), 0),
+        last_activity=Coalesce(
+            Subquery(answers.annotate(last=Max('created_on')).values('last')),
+            F('created_on'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='answer_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.2 on 2026-10-17 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_question_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', '-votes', '-answer_flag', '-created_on'], name='answer_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-created_on', 'title'], name='question_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-votes', 'title'], name='question_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voters',
+            index=models.Index(fields=['content_type', 'object_id', 'user_id'], name='voters_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.0.2 on 2026-10-17 23:01
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def fill_hot_scores(apps, schema_editor):
+    # initial scores, so that the hot tab and the trending sidebar are
+    # ranked before recompute_hot_scores runs for the first time
+    from questions.ranking import hot_score
+    Question = apps.get_model('questions', 'Question')
+    now = django.utils.timezone.now()
+    questions = Question.objects.order_by('id').only(
+        'id', 'votes', 'answer_count', 'created_on')
+    last_id = 0
+    while True:
+        batch = list(questions.filter(id__gt=last_id)[:1000])
+        if not batch:
+            break
+        for qw in batch:
+            qw.hot_score = hot_score(qw.votes, qw.answer_count,
+                                     qw.created_on, now)
+            qw.scored_on = now
+        Question.objects.bulk_update(batch, ['hot_score', 'scored_on'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0003_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='question',
+            name='question_hot_idx',
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='scored_on',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='touched_on',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-hot_score', 'title'], name='question_hotscore_idx'),
+        ),
+        migrations.RunPython(fill_hot_scores, migrations.RunPython.noop),
+    ]
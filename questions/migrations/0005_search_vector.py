@@ -0,0 +1,48 @@
+# Generated by Django 4.0.2 on 2026-10-17 23:03
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+# PostgreSQL only: GIN index on the document and its initial contents
+FILL_SEARCH_VECTOR = '''
+UPDATE questions_question SET search_vector =
+    setweight(to_tsvector(%(config)s, title), 'A')
+    || setweight(to_tsvector(%(config)s, content), 'B')
+    || setweight(to_tsvector(%(config)s, coalesce((
+        SELECT string_agg(a.content, ' ') FROM questions_answer a
+        WHERE a.question_id = questions_question.id
+    ), '')), 'C')
+'''
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(FILL_SEARCH_VECTOR,
+                          params={'config': settings.SEARCH_CONFIG})
+    schema_editor.execute(
+        'CREATE INDEX question_search_idx ON questions_question '
+        'USING gin (search_vector)')
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS question_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0004_hot_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.2 on 2026-10-18 00:12
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# PostgreSQL only: GIN trigram index for typo tolerant title search
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX question_title_trgm_idx ON questions_question '
+        'USING gin (title gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS question_title_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0005_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),     # does nothing on other databases
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
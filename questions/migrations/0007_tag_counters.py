@@ -0,0 +1,49 @@
+# Generated by Django 4.0.2 on 2026-10-18 00:19
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+
+def fill_counters(apps, schema_editor):
+    Tag = apps.get_model('questions', 'Tag')
+    tagged = Tag.questions.through.objects.filter(
+        tag=OuterRef('pk')).order_by().values('tag')
+    Tag.objects.update(
+        question_count=Coalesce(
+            Subquery(tagged.annotate(n=Count('pk')).values('n')), 0),
+        last_activity=Coalesce(
+            Subquery(tagged.annotate(
+                last=Max('question__created_on')).values('last')),
+            F('last_activity'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0006_title_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='question_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-question_count', 'title'], name='tag_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-last_activity', 'title'], name='tag_recent_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.0.2 on 2026-10-17 23:24
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_votes(apps, schema_editor):
+    """
+    Racing votes could create several rows for one user and object:
+    keep the oldest one with the summed vote clipped to (-1, 1).
+    """
+    Voters = apps.get_model('questions', 'Voters')
+    duplicates = Voters.objects.values(
+        'content_type', 'object_id', 'user_id').annotate(
+        rows=Count('id'), first=Min('id'), total=Sum('vote')).filter(
+        rows__gt=1)
+    for row in duplicates.iterator():
+        Voters.objects.filter(
+            content_type=row['content_type'], object_id=row['object_id'],
+            user_id=row['user_id']).exclude(id=row['first']).delete()
+        Voters.objects.filter(id=row['first']).update(
+            vote=max(-1, min(1, row['total'])))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0007_tag_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_votes, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='voters',
+            name='voters_lookup_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='voters',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id', 'user_id'), name='voters_unique_vote'),
+        ),
+    ]
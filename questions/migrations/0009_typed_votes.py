@@ -0,0 +1,42 @@
+# Generated by Django 4.0.2 on 2026-10-17 23:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('questions', '0008_voters_unique_vote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote', models.SmallIntegerField(choices=[(-1, 'Downvote'), (0, 'No_vote'), (1, 'Upvote')], default=0)),
+                ('answer', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='questions.answer')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote', models.SmallIntegerField(choices=[(-1, 'Downvote'), (0, 'No_vote'), (1, 'Upvote')], default=0)),
+                ('question', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='questions.question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='questionvote',
+            constraint=models.UniqueConstraint(fields=('question', 'user'), name='question_vote_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='answervote',
+            constraint=models.UniqueConstraint(fields=('answer', 'user'), name='answer_vote_unique'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def copy_votes(apps, schema_editor):
+    """
+    Stream Voters rows into QuestionVote and AnswerVote in batches of
+    increasing id. Rows without a vote and rows of deleted questions,
+    answers or users are left behind. Safe to run again.
+    """
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Voters = apps.get_model('questions', 'Voters')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    targets = {}    # content type id -> (model, vote model, column)
+    for name in ('question', 'answer'):
+        content_type = ContentType.objects.filter(
+            app_label='questions', model=name).first()
+        if content_type is not None:
+            targets[content_type.id] = (
+                apps.get_model('questions', name),
+                apps.get_model('questions', f'{name}vote'),
+                f'{name}_id')
+
+    last_id = 0
+    while targets:
+        rows = list(Voters.objects.filter(id__gt=last_id).order_by(
+            'id').values_list(
+                'id', 'content_type_id', 'object_id', 'user_id', 'vote')[
+            :BATCH_SIZE])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        users = set(User.objects.filter(
+            id__in={row[3] for row in rows}).values_list('id', flat=True))
+        for content_type_id, (model, vote_model, column) in targets.items():
+            votes = [
+                row for row in rows
+                if row[1] == content_type_id and row[4] and row[3] in users
+            ]
+            existing = set(model.objects.filter(
+                id__in={row[2] for row in votes}).values_list('id', flat=True))
+            vote_model.objects.bulk_create([
+                vote_model(**{column: object_id}, user_id=user_id, vote=vote)
+                for _, _, object_id, user_id, vote in votes
+                if object_id in existing
+            ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    # every batch is committed on its own, the copy is restartable
+    atomic = False
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('questions', '0009_typed_votes'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_votes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0010_copy_votes'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Voters',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.2 on 2026-10-17 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0011_delete_voters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='answer',
+            name='answer_order_idx',
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', '-votes', '-created_on', '-id'], name='answer_page_idx'),
+        ),
+    ]
@@ -1,8 +1,13 @@
 from django.conf import settings as sett
-from django.contrib.contenttypes.fields import GenericForeignKey
-from django.contrib.contenttypes.models import ContentType
-from django.db import models, transaction
+from django.contrib.postgres.search import SearchVectorField
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
+from .caching import versioned_key
+from .page_cache import pages_changed, trending_changed
 from .helpers import get_time_diff
 
 QUESTION_STATUS = (
@@ -22,6 +27,41 @@ VOTE_STATUS = (
 )
 
 
+class QuestionQuerySet(models.QuerySet):
+
+    def listing(self):
+        """
+        Questions ready to be shown as cards in question lists: authors
+        are joined and tags are prefetched, so a page of any size costs
+        a fixed number of queries.
+        """
+        return self.select_related('author').prefetch_related('tag_set')
+
+    def detail(self):
+        """
+        Questions ready to be shown on their page: the author is joined
+        with the profile (avatar) and tags are prefetched.
+        """
+        return self.select_related('author__profile').prefetch_related(
+            'tag_set')
+
+    def rebuild_counters(self):
+        """
+        Recount denormalized answer_count and last_activity columns
+        from the Answer table with a single UPDATE statement.
+        """
+        answers = Answer.objects.filter(
+            question=OuterRef('pk')).order_by().values('question')
+        return self.update(
+            answer_count=Coalesce(
+                Subquery(answers.annotate(n=Count('pk')).values('n')), 0),
+            last_activity=Coalesce(
+                Subquery(answers.annotate(
+                    last=Max('created_on')).values('last')),
+                F('created_on'))
+        )
+
+
 class Question(models.Model):
     title = models.CharField(max_length=200, unique=True)
     author = models.ForeignKey(sett.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -29,6 +69,27 @@ class Question(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     status = models.IntegerField(choices=QUESTION_STATUS, default=0)
     votes = models.IntegerField(default=0)
+    # denormalized, maintained by questions.signals
+    answer_count = models.IntegerField(default=0)
+    last_activity = models.DateTimeField(default=timezone.now)
+    # ranking of hot questions, see questions.ranking
+    hot_score = models.FloatField(default=0)
+    touched_on = models.DateTimeField(default=timezone.now, db_index=True)
+    scored_on = models.DateTimeField(null=True, blank=True, db_index=True)
+    # full-text search document (PostgreSQL only), see questions.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # index: new questions
+            models.Index(fields=['-created_on', 'title'],
+                         name='question_new_idx'),
+            # index_hot and trending sidebar
+            models.Index(fields=['-hot_score', 'title'],
+                         name='question_hotscore_idx'),
+        ]
 
     def __str___(self):
         return self.title
@@ -37,11 +98,12 @@ class Question(models.Model):
         return Answer.objects.filter(question=self.id).count()
 
     def get_tags(self):
-        return Tag.objects.filter(questions=self.id)
+        # uses tags prefetched by QuestionQuerySet.listing() if any
+        return self.tag_set.all()
 
     @property
     def number_answers(self):
-        return self.get_answers_number()
+        return self.answer_count
 
     @property
     def tags(self):
@@ -53,10 +115,54 @@ class Question(models.Model):
 
     @classmethod
     def trending(cls):
-        queryset = cls.objects.all().order_by('-votes')
+        queryset = cls.objects.all().order_by('-hot_score', 'title')
         # return first X trending questions
         return queryset[:sett.TRENDING_QUESTIONS_NUMBER]
 
+    @classmethod
+    def cached_trending(cls) -> list:
+        """
+        Trending questions as a list of dicts (id, title, votes,
+        hot_score) served from the versioned cache.
+        See Question.refresh_trending().
+        """
+        trending = cache.get(versioned_key('trending'))
+        if trending is None:
+            trending = list(cls.trending().values(
+                'id', 'title', 'votes', 'hot_score'))
+            cache.set(versioned_key('trending'), trending,
+                      sett.TRENDING_CACHE_TTL)
+        return trending
+
+    @staticmethod
+    def refresh_trending(question, deleted=False):
+        """
+        Invalidate cached trending questions if the question is shown
+        there or could enter the top list. Costs no queries.
+        Hot scores themselves are changed by questions.ranking which
+        invalidates the whole list.
+        """
+        trending = cache.get(versioned_key('trending'))
+        if trending is None:
+            return
+        in_top = any(trend['id'] == question.id for trend in trending)
+        could_enter = not deleted and (
+            len(trending) < sett.TRENDING_QUESTIONS_NUMBER
+            or question.hot_score >= trending[-1]['hot_score']
+        )
+        if in_top or could_enter:
+            trending_changed()
+
+
+class AnswerQuerySet(models.QuerySet):
+
+    def detail(self):
+        """
+        Answers ready to be shown on the question page, with authors
+        and their profiles joined.
+        """
+        return self.select_related('author__profile')
+
 
 class Answer(models.Model):
     author = models.ForeignKey(sett.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -66,6 +172,16 @@ class Answer(models.Model):
     answer_flag = models.IntegerField(choices=ANSWER_STATUS, default=0)
     votes = models.IntegerField(default=0)
 
+    objects = AnswerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # pages of answers on the question page
+            models.Index(
+                fields=['question', '-votes', '-created_on', '-id'],
+                name='answer_page_idx'),
+        ]
+
     @transaction.atomic
     def set_new_flag(self):
         """
@@ -76,8 +192,8 @@ class Answer(models.Model):
         qw = self.question
         self.answer_flag = 1
         qw.status = 1
-        qw.save()
-        self.save()
+        qw.save(update_fields=['status'])
+        self.save(update_fields=['answer_flag'])
 
     @transaction.atomic
     def change_flag(self):
@@ -90,8 +206,8 @@ class Answer(models.Model):
         prev_answer = qw.answer_set.get(answer_flag=1)
         prev_answer.answer_flag = 0
         self.answer_flag = 1
-        prev_answer.save()
-        self.save()
+        prev_answer.save(update_fields=['answer_flag'])
+        self.save(update_fields=['answer_flag'])
 
     @transaction.atomic
     def delete_flag(self):
@@ -103,71 +219,195 @@ class Answer(models.Model):
         qw = self.question
         self.answer_flag = 0
         qw.status = 0
-        self.save()
-        qw.save()
+        self.save(update_fields=['answer_flag'])
+        qw.save(update_fields=['status'])
+
+
+class TagQuerySet(models.QuerySet):
+
+    def rebuild_counters(self):
+        """
+        Recount denormalized question_count and last_activity columns
+        from the Tag.questions through table with a single UPDATE.
+        """
+        tagged = Tag.questions.through.objects.filter(
+            tag=OuterRef('pk')).order_by().values('tag')
+        return self.update(
+            question_count=Coalesce(
+                Subquery(tagged.annotate(n=Count('pk')).values('n')), 0),
+            last_activity=Coalesce(
+                Subquery(tagged.annotate(
+                    last=Max('question__created_on')).values('last')),
+                F('last_activity'))
+        )
 
 
 class Tag(models.Model):
     title = models.CharField(max_length=15, unique=True)
     questions = models.ManyToManyField(Question)
+    # denormalized, maintained by questions.signals
+    question_count = models.IntegerField(default=0)
+    last_activity = models.DateTimeField(default=timezone.now)
+
+    objects = TagQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # tag directory orderings
+            models.Index(fields=['-question_count', 'title'],
+                         name='tag_popular_idx'),
+            models.Index(fields=['-last_activity', 'title'],
+                         name='tag_recent_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def active_ago(self):
+        return get_time_diff(self.last_activity)
+
+
+class Vote(models.Model):
+    """
+    Vote of a user for a question or for an answer, see QuestionVote
+    and AnswerVote. There are no composite primary keys in Django, the
+    pair of the voted object and the user is unique instead.
+    """
+    user = models.ForeignKey(sett.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    vote = models.SmallIntegerField(choices=VOTE_STATUS, default=0)
 
-class Voters(models.Model):
-    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.PositiveIntegerField()
-    content_object = GenericForeignKey('content_type', 'object_id')
-    vote = models.IntegerField(choices=VOTE_STATUS, default=0)
-    user_id = models.PositiveIntegerField()
+    target = None   # name of the ForeignKey to the voted object
+
+    class Meta:
+        abstract = True
 
     @staticmethod
-    @transaction.atomic
     def register_vote(object: Question or Answer,
-                      user_id: int, vote: int):
+                      user_id: int, vote: int) -> bool:
         """
         User votes for a question or for an answer.
         * object: instance of Question or Answer model classes
         * user_id: request.user.id
         * vote: 1 or 0 (if user upvoted or downvoted)
+        Returns False if the vote has not been counted, see cast_vote().
         """
-        object_ct = ContentType.objects.get_for_model(object)
-        any_voters = Voters.objects.filter(
-            content_type=object_ct,
-            object_id=object.id,
-            user_id=user_id).count()
+        return Vote.cast_vote(object, user_id, vote) is not None
 
-        if not any_voters:
-            # creating new Voters record
-            user_vote = Voters(content_object=object,
-                               user_id=user_id)
-        else:
-            # fetch existing Voters record
-            user_vote = Voters.objects.get(
-                content_type=object_ct,
-                object_id=object.id,
-                user_id=user_id)
-
-        user_upvoted = bool(vote)
-        if user_upvoted:
-            if user_vote.vote in (0, -1):
-                # user can upvote only if he never voted
-                # or if he has downvoted earlier
-                object.votes += 1
-                user_vote.vote += 1
-                user_vote.save()
-            else:
-                return False
+    @staticmethod
+    @transaction.atomic
+    def cast_vote(object: Question or Answer, user_id: int, vote: int):
+        """
+        Same as register_vote() but returns the vote of the user after
+        voting (-1, 0 or 1) or None if the vote has not been counted.
+
+        Takes two statements: the vote row is upserted and then the
+        votes counter of the object is changed with F(), so concurrent
+        votes are never lost. With settings.VOTE_BUFFER the second
+        statement is deferred to questions.votes. A user's vote stays
+        in the corridor (-1, 0, 1) and cannot move any further.
+        """
+        delta = 1 if vote else -1
+        vote_model = (QuestionVote if isinstance(object, Question)
+                      else AnswerVote)
+        user_vote = vote_model._upsert_vote(object.id, user_id, delta)
+        if user_vote is None:
+            return None
+        if sett.VOTE_BUFFER:
+            # the counter is updated later in a batch, see questions.votes
+            from .votes import vote_buffer
+            object.votes += delta
+            transaction.on_commit(lambda: vote_buffer.add(object, delta))
+            return user_vote
+
+        model = type(object)
+        changes = {'votes': F('votes') + delta}
+        if isinstance(object, Question):
+            changes['touched_on'] = timezone.now()   # to be rescored
+        model.objects.filter(pk=object.pk).update(**changes)
+        # keep the instance in line for the caller
+        object.votes += delta
+        if isinstance(object, Question):
+            Question.refresh_trending(object)
+            pages_changed([object.id])
         else:
-            if user_vote.vote in (0, 1):
-                # user can downvote only if he never voted
-                # or if he has upvoted earlier
-                object.votes -= 1
-                user_vote.vote -= 1
-                user_vote.save()
+            # answer votes are not shown in the question lists
+            pages_changed([object.question_id], lists=False)
+        return user_vote
+
+    @staticmethod
+    def user_votes(user, question, answers) -> tuple:
+        """
+        Votes of the user for the question and for the answers shown
+        with it, fetched with a single query. Returns a tuple of the
+        question vote and a dict of answer votes by answer id; objects
+        the user has not voted for are missing from the dict.
+        """
+        if not user.is_authenticated:
+            return 0, {}
+        question_votes = QuestionVote.objects.filter(
+            question=question, user=user).annotate(
+            kind=Value('question')).values_list('kind', 'question_id', 'vote')
+        answer_votes = AnswerVote.objects.filter(
+            answer__in=[answer.id for answer in answers], user=user).annotate(
+            kind=Value('answer')).values_list('kind', 'answer_id', 'vote')
+        question_vote, votes = 0, {}
+        for kind, object_id, vote in question_votes.union(
+                answer_votes, all=True):
+            if kind == 'question':
+                question_vote = vote
             else:
-                return False
+                votes[object_id] = vote
+        return question_vote, votes
+
+    @classmethod
+    def _upsert_vote(cls, object_id, user_id, delta):
+        """
+        INSERT ... ON CONFLICT DO UPDATE adding delta to the user's
+        vote unless it would leave the corridor. Returns the new vote,
+        None if the row has been left as it was.
+        """
+        qn = connection.ops.quote_name
+        table = qn(cls._meta.db_table)
+        key = ', '.join(qn(cls._meta.get_field(name).column)
+                        for name in (cls.target, 'user'))
+        vote = qn('vote')
+        sql = (
+            f'INSERT INTO {table} ({key}, {vote}) VALUES (%s, %s, %s) '
+            f'ON CONFLICT ({key}) DO UPDATE '
+            f'SET {vote} = {table}.{vote} + EXCLUDED.{vote} '
+            f'WHERE {table}.{vote} + EXCLUDED.{vote} BETWEEN -1 AND 1 '
+            f'RETURNING {vote}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [object_id, user_id, delta])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+
+class QuestionVote(Vote):
+    # leading column of the unique index, no index of its own
+    question = models.ForeignKey(Question, on_delete=models.CASCADE,
+                                 db_index=False)
+
+    target = 'question'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'user'],
+                                    name='question_vote_unique'),
+        ]
+
+
+class AnswerVote(Vote):
+    # leading column of the unique index, no index of its own
+    answer = models.ForeignKey(Answer, on_delete=models.CASCADE,
+                               db_index=False)
+
+    target = 'answer'
 
-        object.save()  # saving new votes rate for a question or for an answer
-        return True
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['answer', 'user'],
+                                    name='answer_vote_unique'),
+        ]
@@ -0,0 +1,117 @@
+"""
+Full-page cache of read-only views for anonymous visitors.
+
+A page is cached under its URL and the versions of what it shows
+(see questions.caching): the question lists or the question itself.
+Writes bump the versions after commit - questions, answers and their
+authors in questions.signals, votes in Vote.cast_vote() and
+questions.votes - so a changed page is never served from the cache.
+settings.PAGE_CACHE_TTL is a safety net only.
+
+The trending sidebar of base.html is on every page and changes with
+any vote on a top question. It is not part of the key: the sidebar of
+a cached page is rendered again from the cached trending questions on
+every hit, see trending.html.
+
+Cached pages must not depend on the visitor: pages using a csrf token
+are never cached, that's why the search form is sent with GET.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from .caching import bump_version, get_version
+
+LISTS_VERSION = 'question_lists'    # index, hot and tag pages
+TRENDING_VERSION = 'trending'       # see Question.cached_trending()
+TRENDING_START = b'<!-- trending -->'
+TRENDING_END = b'<!-- /trending -->'
+
+
+def question_version(question_id) -> str:
+    return f'question:{question_id}'
+
+
+def pages_changed(question_ids=(), lists=True):
+    """
+    Invalidate cached pages of the questions and, unless lists is
+    False, the question lists. Versions are bumped after commit, so
+    that nobody caches a page of the old data under the new version.
+    """
+    names = [question_version(question_id) for question_id in question_ids]
+    if lists:
+        names.append(LISTS_VERSION)
+
+    def bump():
+        for name in names:
+            bump_version(name)
+
+    if names:
+        transaction.on_commit(bump)
+
+
+def trending_changed():
+    """
+    Invalidate the cached trending questions after commit, see
+    Question.cached_trending().
+    """
+    transaction.on_commit(lambda: bump_version(TRENDING_VERSION))
+
+
+def _page_key(request, versions) -> str:
+    url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    stamp = '.'.join(str(get_version(name)) for name in versions)
+    return f'page:{url}:{stamp}'
+
+
+def _fresh_trending(request, response):
+    content = response.content
+    start = content.find(TRENDING_START)
+    end = content.find(TRENDING_END, start)
+    if start == -1 or end == -1:
+        return response
+    trending = render_to_string('trending.html', request=request).rstrip()
+    response.content = (content[:start]
+                        + trending.encode(response.charset)
+                        + content[end + len(TRENDING_END):])
+    return response
+
+
+def _cacheable(request, response) -> bool:
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def cache_page_for_anonymous(*versions):
+    """
+    Serve GET requests of anonymous visitors from the cache. versions
+    are names of the versions the page depends on, or functions of the
+    view keyword arguments returning such a name. The trending sidebar
+    of a cached page is always up to date.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            names = [
+                version(**kwargs) if callable(version) else version
+                for version in versions
+            ]
+            key = _page_key(request, names)
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if _cacheable(request, response):
+                    cache.set(key, response, settings.PAGE_CACHE_TTL)
+                return response
+            return _fresh_trending(request, response)
+        return wrapper
+    return decorator
@@ -0,0 +1,361 @@
+import base64
+import binascii
+import bisect
+import hashlib
+import json
+from collections.abc import Sequence
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+class WindowedPage(Page):
+
+    @property
+    def page_window(self):
+        """
+        Page numbers to show in the page bar: a few pages around the
+        current one plus both ends, the rest elided. The last page is
+        not shown if the total is only an estimate.
+        """
+        on_ends = 0 if self.paginator.count_is_estimate else 1
+        return self.paginator.get_elided_page_range(
+            self.number, on_each_side=2, on_ends=on_ends)
+
+
+class WindowedPaginator(Paginator):
+    """
+    Plain offset paginator which does not render the whole page_range
+    in templates.
+    """
+    count_is_estimate = False
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+
+class EstimatedCountPaginator(WindowedPaginator):
+    """
+    Offset paginator which avoids exact COUNT(*) over big results.
+    On PostgreSQL the planner row estimate is used when it is above
+    settings.PAGINATOR_ESTIMATE_THRESHOLD, smaller results are counted
+    exactly. Counts are cached per filter (the SQL of the queryset)
+    for settings.PAGINATOR_COUNT_CACHE_TTL seconds.
+
+    The estimate may be wrong either way, so with an estimated total
+    pages are not validated against it: one more row than a page is
+    fetched to tell whether the next page exists.
+    """
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        key = self._count_cache_key()
+        cached = cache.get(key)
+        if cached is None:
+            cached = self._count_or_estimate()
+            cache.set(key, cached, settings.PAGINATOR_COUNT_CACHE_TTL)
+        count, self.count_is_estimate = cached
+        return count
+
+    def validate_number(self, number):
+        if not (self.count and self.count_is_estimate):
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_estimate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        if not has_next:
+            # the end is reached, the total is known exactly now
+            self._set_count(bottom + len(rows), is_estimate=False)
+        elif bottom + len(rows) >= self.count:
+            # underestimated: keep the next page reachable
+            self._set_count(bottom + len(rows) + 1, is_estimate=True)
+        return self._get_page(rows, number, self)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # past the real end of an overestimated result
+            return self.page(1)
+
+    def _set_count(self, count, is_estimate):
+        self.count = count      # replaces the cached property
+        self.count_is_estimate = is_estimate
+        for name in ('num_pages', 'page_range'):
+            self.__dict__.pop(name, None)
+
+    def _count_cache_key(self):
+        sql, params = self.object_list.order_by().query.sql_with_params()
+        digest = hashlib.md5(repr((sql, params)).encode()).hexdigest()
+        return f'paginator_count:{self.object_list.db}:{digest}'
+
+    def _count_or_estimate(self):
+        """
+        Return (count, is_estimate) tuple.
+        """
+        estimate = self._estimate_count()
+        if (estimate is not None
+                and estimate >= settings.PAGINATOR_ESTIMATE_THRESHOLD):
+            return estimate, True
+        return self.object_list.count(), False
+
+    def _estimate_count(self):
+        """
+        Row estimate of the PostgreSQL planner for the queryset,
+        None for other database backends.
+        """
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = self.object_list.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class IdListPaginator(WindowedPaginator):
+    """
+    Offset paginator over a ranked list of primary keys (e.g. search
+    results). Only the objects of the requested page are fetched from
+    the queryset, in the order of the list.
+    """
+
+    def __init__(self, ids, per_page, queryset, **kwargs):
+        super().__init__(ids, per_page, **kwargs)
+        self.queryset = queryset
+
+    def page(self, number):
+        page = super().page(number)
+        ids = list(page.object_list)
+        objects = self.queryset.in_bulk(ids)
+        # objects deleted after the ids were collected are skipped
+        page.object_list = [objects[pk] for pk in ids if pk in objects]
+        return page
+
+
+class CursorPage(Sequence):
+    """
+    One page of a keyset-paginated queryset. Mimics the parts of
+    django.core.paginator.Page used by the templates.
+    """
+    cursor_based = True
+
+    def __init__(self, object_list, number, paginator,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Page {self.number} (cursor)>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset (a.k.a. cursor) pagination. Instead of OFFSET and COUNT(*)
+    every page is fetched with a 'WHERE (ordering) > (last row)' filter,
+    so the cost of a page does not depend on how deep it is.
+    * object_list: queryset to paginate
+    * per_page: number of elements on the page
+    * ordering: tuple of field names as for QuerySet.order_by(); the
+      combination of values must be unique (e.g. end with a unique field)
+
+    Cursors are opaque url-safe strings which encode the direction, the
+    page number (for display only) and the ordering values of the
+    boundary row.
+    """
+
+    def __init__(self, object_list, per_page, ordering):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+
+    def get_page(self, cursor=None):
+        """
+        Return a page for the given cursor. Missing or broken cursors
+        lead to the first page, as Paginator.get_page() does with bad
+        page numbers.
+        """
+        try:
+            number, backwards, values = self.decode_cursor(cursor)
+        except ValueError:
+            return self.first_page()
+        if backwards:
+            return self._page_before(values, number)
+        return self._page_after(values, number)
+
+    def first_page(self):
+        rows = list(self.object_list.order_by(
+            *self.ordering)[:self.per_page + 1])
+        return self._make_page(rows[:self.per_page], number=1,
+                               has_next=len(rows) > self.per_page,
+                               has_previous=False)
+
+    def _page_after(self, values, number):
+        queryset = self.object_list.filter(
+            self._keyset_filter(values, backwards=False))
+        rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+        return self._make_page(rows[:self.per_page], number,
+                               has_next=len(rows) > self.per_page,
+                               has_previous=True)
+
+    def _page_before(self, values, number):
+        queryset = self.object_list.filter(
+            self._keyset_filter(values, backwards=True))
+        reverse_ordering = [
+            name if desc else f'-{name}' for name, desc in self.fields
+        ]
+        rows = list(queryset.order_by(*reverse_ordering)[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        if not has_previous:
+            # we have reached the beginning of the list
+            number = 1
+        return self._make_page(rows, number, has_next=True,
+                               has_previous=has_previous)
+
+    def _make_page(self, rows, number, has_next, has_previous):
+        page = CursorPage(rows, max(number, 1), self)
+        if rows and has_next:
+            page.next_cursor = self.encode_cursor(rows[-1], page.number + 1)
+        if rows and has_previous:
+            page.previous_cursor = self.encode_cursor(
+                rows[0], page.number - 1, backwards=True)
+        return page
+
+    def _keyset_filter(self, values, backwards):
+        """
+        Build lexicographic comparison for the ordering fields:
+        (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z)...
+        with '>' flipped for descending fields and for backwards paging.
+        """
+        condition = Q()
+        equal = {}
+        for (name, desc), value in zip(self.fields, values):
+            lookup = 'lt' if desc != backwards else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def encode_cursor(self, row, number, backwards=False):
+        values = []
+        for name, _ in self.fields:
+            value = getattr(row, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps([number, int(backwards), values],
+                         separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            raise ValueError('Empty cursor')
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            number, backwards, values = json.loads(raw)
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+            raise ValueError(f'Malformed cursor: {cursor}')
+        if (type(number) is not int or backwards not in (0, 1)
+                or not isinstance(values, list)
+                or len(values) != len(self.fields)
+                or not all(type(value) in (str, int, float)
+                           for value in values)):
+            # tampered: nested lists, nulls and so on
+            raise ValueError(f'Malformed cursor: {cursor}')
+        model_meta = self.object_list.model._meta
+        try:
+            values = [
+                model_meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise ValueError(f'Malformed cursor: {cursor}')
+        if None in values:
+            raise ValueError(f'Malformed cursor: {cursor}')
+        return number, bool(backwards), values
+
+
+class IdCursorPaginator(CursorPaginator):
+    """
+    Cursor pagination over a sorted array of primary keys (e.g. results
+    of a tag query), highest id first. Page boundaries are found with
+    binary search and only the objects of the page are fetched.
+    """
+
+    def __init__(self, ids, per_page, queryset):
+        super().__init__(queryset, per_page, ordering=('-id',))
+        self.ids = ids
+
+    def first_page(self):
+        return self._hydrate(len(self.ids), number=1, has_previous=False)
+
+    def _page_after(self, values, number):
+        end = bisect.bisect_left(self.ids, values[0])
+        return self._hydrate(end, number, has_previous=True)
+
+    def _page_before(self, values, number):
+        start = bisect.bisect_right(self.ids, values[0])
+        end = min(start + self.per_page, len(self.ids))
+        has_previous = end < len(self.ids)
+        if not has_previous:
+            number = 1
+        return self._hydrate(end, number, has_previous)
+
+    def _hydrate(self, end, number, has_previous):
+        """
+        Make a page of up to per_page ids before <end>, highest first.
+        """
+        start = max(end - self.per_page, 0)
+        ids = list(reversed(self.ids[start:end]))
+        objects = self.object_list.in_bulk(ids)
+        rows = [objects[pk] for pk in ids if pk in objects]
+        return self._make_page(rows, number, has_next=start > 0,
+                               has_previous=has_previous)
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Question
+from .page_cache import trending_changed
+
+
+def hot_score(votes: int, answers: int, created_on, now) -> float:
+    """
+    Hacker News like ranking: question points (votes and answers)
+    divided by its age in hours raised to a gravity power, so old
+    questions sink no matter how many votes they have collected.
+    Negative points count as none: divided by a growing age they would
+    rise towards zero and downvoted questions would climb with time.
+    """
+    points = max(votes + settings.HOT_SCORE_ANSWER_WEIGHT * answers, 0)
+    age_hours = max((now - created_on).total_seconds(), 0) / 3600
+    return points / (age_hours + 2) ** settings.HOT_SCORE_GRAVITY
+
+
+def recompute_hot_scores(now=None, window=None, batch_size=1000) -> int:
+    """
+    Incremental recompute of Question.hot_score. Rescores:
+    * questions touched (voted, answered, created) since the last run,
+      the last run being the latest Question.scored_on
+    * the current top <window> questions, whose scores must decay even
+      if nobody touches them
+    Return number of rescored questions.
+    """
+    now = now or timezone.now()
+    if window is None:
+        window = settings.HOT_SCORE_DECAY_WINDOW
+    last_run = Question.objects.aggregate(last=Max('scored_on'))['last']
+    touched = Question.objects.all()
+    if last_run is not None:
+        touched = touched.filter(touched_on__gte=last_run)
+    ids = set(touched.values_list('id', flat=True).iterator())
+    ids.update(Question.objects.order_by(
+        '-hot_score', 'title').values_list('id', flat=True)[:window])
+
+    ids = sorted(ids)
+    for start in range(0, len(ids), batch_size):
+        questions = list(Question.objects.filter(
+            id__in=ids[start:start + batch_size]).only(
+                'id', 'votes', 'answer_count', 'created_on'))
+        for qw in questions:
+            qw.hot_score = hot_score(qw.votes, qw.answer_count,
+                                     qw.created_on, now)
+            qw.scored_on = now
+        with transaction.atomic():
+            Question.objects.bulk_update(
+                questions, ['hot_score', 'scored_on'])
+    if ids:
+        trending_changed()
+    return len(ids)
@@ -0,0 +1,73 @@
+"""
+Question search. The engine is pluggable, see settings.SEARCH_BACKEND
+and questions.search.backends.BaseSearchBackend.
+"""
+import functools
+import re
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from questions.caching import get_version
+from .cache import ResultCache
+from .query import WHITESPACE_RE, analyze, parse_search  # noqa F401
+
+TAG_RE = re.compile(r'(^|\s)(-?tag:)\s*')
+
+# questions.signals bumps this version on question and answer writes
+CONTENT_VERSION = 'content'
+
+result_cache = ResultCache()
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend():
+    """
+    Search backend instance named by settings.SEARCH_BACKEND. By default
+    PostgreSQL full-text search is used on PostgreSQL and substring
+    search in the database elsewhere.
+    """
+    path = settings.SEARCH_BACKEND
+    if path is None:
+        if connection.vendor == 'postgresql':
+            path = 'questions.search.backends.PostgresBackend'
+        else:
+            path = 'questions.search.backends.DatabaseBackend'
+    return import_string(path)()
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting in ('SEARCH_BACKEND', 'SEARCH_INDEX_PATH'):
+        get_backend.cache_clear()
+        result_cache.clear()
+
+
+def normalize_query(search: str) -> str:
+    """
+    Canonical form of a search phrase used as a cache key: lowercase,
+    single spaces and no spaces after 'tag:'.
+    """
+    search = WHITESPACE_RE.sub(' ', search).strip().lower()
+    return TAG_RE.sub(r'\1\2', search)
+
+
+def search_question_ids(search: str) -> list:
+    """
+    Ids of questions matching the search phrase, best matches first.
+    If nothing is found, questions with similar titles are returned.
+    Results are cached until the next content write.
+    """
+    search = normalize_query(search)
+    generation = get_version(CONTENT_VERSION)
+    ids = result_cache.get(search, generation)
+    if ids is None:
+        backend = get_backend()
+        limit = settings.SEARCH_MAX_RESULTS
+        ids = backend.search(search, limit) or \
+            backend.fuzzy_search(search, limit)
+        ids = result_cache.set(search, generation, ids)
+    return ids
@@ -0,0 +1,195 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField,
+                                            TrigramWordSimilarity)
+from django.db import connection, transaction
+from django.db.models import (BooleanField, F, Func, OuterRef, Q, Subquery,
+                              TextField, Value)
+from django.db.models.functions import Coalesce
+
+from questions.models import Answer, Question
+from .fuzzy import title_index
+from .query import parse_search
+
+
+def fuzzy_text(search: str) -> str:
+    """
+    Words of the search phrase without quotes and prefix stars.
+    """
+    return ' '.join(text for _, text in parse_search(search))
+
+
+class WordSimilar(Func):
+    """
+    pg_trgm "text <% column" operator: true if the column has a word
+    extent similar enough to the text (pg_trgm.word_similarity_threshold).
+    Unlike a comparison of word_similarity() it can use a trigram index.
+    """
+    arg_joiner = ' <%% '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+class WeightedVector(Func):
+    """
+    setweight(to_tsvector(config, text), weight), a part of the document
+    built by FILL_SEARCH_VECTOR of migration 0005. SearchVector() is not
+    used: on Django 4.0.2 it fails on TextField columns with "mixed
+    types: TextField, CharField".
+    """
+    template = "setweight(to_tsvector(%(expressions)s), '%(weight)s')"
+    output_field = SearchVectorField()
+
+    def __init__(self, expression, weight, config):
+        super().__init__(Value(config), expression, weight=weight)
+
+
+class Document(Func):
+    """
+    Concatenation of tsvectors.
+    """
+    arg_joiner = ' || '
+    template = '(%(expressions)s)'
+    output_field = SearchVectorField()
+
+
+class BaseSearchBackend:
+    """
+    Search backends find questions by a search phrase. Phrase syntax is
+    the one of questions.search.query.parse_search(): plain words,
+    "quoted phrases" and prefix* terms.
+    """
+
+    def search(self, search: str, limit: int) -> list:
+        """
+        Return ids of up to <limit> matching questions, best first.
+        """
+        raise NotImplementedError
+
+    def fuzzy_search(self, search: str, limit: int) -> list:
+        """
+        Return ids of up to <limit> questions with titles similar to the
+        search phrase, most similar first. Tolerates typos, so it is
+        used when search() finds nothing. By default an in-process
+        trigram index of titles is used.
+        """
+        text = fuzzy_text(search)
+        if not text:
+            return []
+        return title_index.search(text, limit)
+
+    def update_question(self, question_id):
+        """
+        Question or one of its answers has been saved or deleted.
+        """
+
+    def remove_question(self, question_id):
+        """
+        Question has been deleted.
+        """
+
+    def rebuild(self):
+        """
+        Reindex all the questions from scratch.
+        """
+
+
+class DatabaseBackend(BaseSearchBackend):
+    """
+    Case-insensitive substring search in questions and answers. Works
+    everywhere, but scans both tables.
+    """
+
+    def search(self, search, limit):
+        queryset = Question.objects.filter(
+                Q(title__icontains=search)
+              | Q(content__icontains=search)                    # noqa E131
+              | Q(answer__content__icontains=search)            # noqa E131
+            ).distinct().order_by('-votes', '-created_on')
+        return list(queryset.values_list('id', flat=True)[:limit])
+
+
+class PostgresBackend(BaseSearchBackend):
+    """
+    PostgreSQL full-text search over Question.search_vector (GIN
+    indexed), ranked with ts_rank.
+    """
+
+    def search(self, search, limit):
+        query = self.make_search_query(search)
+        if query is None:
+            return []
+        queryset = Question.objects.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-votes', '-created_on')
+        return list(queryset.values_list('id', flat=True)[:limit])
+
+    def fuzzy_search(self, search, limit):
+        """
+        Trigram word similarity of titles, backed by the GIN trigram
+        index on Question.title.
+        """
+        text = fuzzy_text(search)
+        if not text:
+            return []
+        cutoff = settings.SEARCH_FUZZY_CUTOFF
+        queryset = Question.objects.filter(
+            WordSimilar(Value(text), F('title'))
+        ).annotate(
+            similarity=TrigramWordSimilarity(Value(text), 'title')
+        ).filter(
+            similarity__gte=cutoff
+        ).order_by('-similarity', '-id')
+        with transaction.atomic(), connection.cursor() as cursor:
+            # the <% operator has a threshold of its own, for this
+            # transaction only it is the same as the cutoff
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', "
+                "%s, true)", [str(cutoff)])
+            return list(queryset.values_list('id', flat=True)[:limit])
+
+    def update_question(self, question_id):
+        Question.objects.filter(pk=question_id).update(
+            search_vector=self.search_vector())
+
+    def rebuild(self):
+        Question.objects.update(search_vector=self.search_vector())
+
+    @staticmethod
+    def make_search_query(search: str):
+        """
+        Build a tsquery matching all the tokens of the search phrase,
+        None if there is nothing to search for.
+        """
+        config = settings.SEARCH_CONFIG
+        query = None
+        for kind, text in parse_search(search):
+            if kind == 'phrase':
+                token = SearchQuery(text, config=config,
+                                    search_type='phrase')
+            elif kind == 'prefix':
+                token = SearchQuery(f'{text}:*', config=config,
+                                    search_type='raw')
+            else:
+                token = SearchQuery(text, config=config)
+            query = token if query is None else query & token
+        return query
+
+    @staticmethod
+    def search_vector():
+        """
+        Expression for Question.search_vector: title, content and the
+        text of all answers, weighted in that order.
+        """
+        config = settings.SEARCH_CONFIG
+        answers = Answer.objects.filter(
+            question=OuterRef('pk')).order_by().values('question').annotate(
+                text=StringAgg('content', delimiter=' ',
+                               output_field=TextField())).values('text')
+        return Document(
+            WeightedVector(F('title'), 'A', config),
+            WeightedVector(F('content'), 'B', config),
+            WeightedVector(Coalesce(Subquery(answers), Value(''),
+                                    output_field=TextField()), 'C', config),
+        )
@@ -0,0 +1,49 @@
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class ResultCache:
+    """
+    Process-local LRU cache of search results: ordered arrays of
+    question ids keyed by the normalized search phrase. An entry is
+    valid for settings.SEARCH_CACHE_TTL seconds and only for the content
+    generation it was computed for (see questions.caching.get_version),
+    so any question or answer write invalidates the whole cache at once.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()   # key -> (generation, expires, ids)
+        self._lock = threading.Lock()
+
+    def get(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_generation, expires, ids = entry
+            if entry_generation != generation or expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return ids
+
+    def set(self, key, generation, ids):
+        ids = array('q', ids)
+        expires = time.monotonic() + settings.SEARCH_CACHE_TTL
+        with self._lock:
+            self._entries[key] = (generation, expires, ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.SEARCH_CACHE_SIZE:
+                self._entries.popitem(last=False)
+        return ids
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,98 @@
+"""
+Typo tolerant title search for databases without pg_trgm.
+"""
+import heapq
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+
+from questions.models import Question
+from .query import WORD_RE
+from .sync import ProcessIndex
+
+
+def trigrams(text: str) -> set:
+    """
+    Character trigrams of every word of the text, padded the way
+    pg_trgm does it: two spaces in front and one after the word.
+    """
+    grams = set()
+    for word in WORD_RE.findall(text.lower()):
+        word = f'  {word} '
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    Character trigram index of question titles. Postings are arrays of
+    slot numbers, every (re)indexed title gets a new slot and the old
+    one is marked dead, so updates never rewrite postings.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(lambda: array('I'))
+        self.slot_ids = array('q')      # slot -> question id, -1 if dead
+        self.slots = {}                 # question id -> slot
+
+    def add(self, doc_id, title):
+        self.remove(doc_id)
+        slot = len(self.slot_ids)
+        self.slot_ids.append(doc_id)
+        self.slots[doc_id] = slot
+        for gram in trigrams(title):
+            self.postings[gram].append(slot)
+
+    def remove(self, doc_id):
+        slot = self.slots.pop(doc_id, None)
+        if slot is not None:
+            self.slot_ids[slot] = -1
+
+    def search(self, text: str, limit: int, cutoff: float) -> list:
+        """
+        Ids of titles containing at least <cutoff> share of the trigrams
+        of the text, most similar first. Like word_similarity() of
+        pg_trgm, the rest of the title does not lower the similarity.
+        """
+        grams = trigrams(text)
+        if not grams:
+            return []
+        shared = defaultdict(int)
+        for gram in grams:
+            for slot in self.postings.get(gram, ()):
+                shared[slot] += 1
+        matches = (
+            (count / len(grams), self.slot_ids[slot])
+            for slot, count in shared.items()
+            if self.slot_ids[slot] != -1 and count / len(grams) >= cutoff
+        )
+        return [doc_id for _, doc_id in heapq.nlargest(limit, matches)]
+
+
+class TitleIndex(ProcessIndex):
+    """
+    Process-local TrigramIndex of all question titles. Deleted questions
+    stay in the index until the process restarts, callers skip them when
+    hydrating.
+    """
+
+    def build(self):
+        index = TrigramIndex()
+        for doc_id, title in Question.objects.values_list(
+                'id', 'title').iterator():
+            index.add(doc_id, title)
+        return index
+
+    def update(self, index, since):
+        for doc_id, title in Question.objects.filter(
+                touched_on__gte=since).values_list('id', 'title'):
+            index.add(doc_id, title)
+
+    def search(self, text, limit):
+        with self._lock:
+            return self.index.search(text, limit,
+                                     settings.SEARCH_FUZZY_CUTOFF)
+
+
+title_index = TitleIndex()
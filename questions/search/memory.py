@@ -0,0 +1,343 @@
+import bisect
+import heapq
+import itertools
+import math
+import threading
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from questions.models import Answer, Question
+from .backends import BaseSearchBackend
+from .query import analyze, parse_search
+from .snapshot import SnapshotError, read_snapshot, write_snapshot
+from .sync import ProcessIndex
+
+TITLE_WEIGHT = 3        # title terms are counted that many times
+MAX_PREFIX_TERMS = 50   # prefix* is expanded to that many terms at most
+
+
+class InvertedIndex:
+    """
+    Inverted index of question documents ranked with Okapi BM25.
+
+    The index is made of an immutable base segment, usually mapped from
+    a snapshot file, and a small mutable segment with documents added
+    after the snapshot was built. Changed or removed base documents are
+    masked by a set of deleted ids. Base postings are two parallel
+    arrays per term range: sorted document ids and term frequencies.
+    """
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        # base segment
+        self.vocabulary = []            # sorted terms
+        self.term_numbers = {}          # term -> position in vocabulary
+        self.term_starts = array('q', [0])
+        self.postings_ids = array('q')
+        self.postings_freqs = array('I')
+        self.base_doc_ids = array('q')  # sorted
+        self.base_doc_lengths = array('I')
+        self.deleted = set()
+        # mutable segment
+        self.live_postings = defaultdict(dict)    # term -> {doc id: tf}
+        self.live_docs = {}             # doc id -> (length, terms)
+
+        self.built_on = timezone.now()
+        self.doc_count = 0
+        self.total_length = 0
+        self.lock = threading.RLock()
+
+    # documents
+
+    def add_document(self, doc_id, title, content):
+        """
+        Index (or reindex) a document.
+        """
+        terms = analyze(title) * TITLE_WEIGHT + analyze(content)
+        counts = Counter(terms)
+        with self.lock:
+            self.remove_document(doc_id)
+            for term, tf in counts.items():
+                self.live_postings[term][doc_id] = tf
+            self.live_docs[doc_id] = (len(terms), list(counts))
+            self.doc_count += 1
+            self.total_length += len(terms)
+
+    def remove_document(self, doc_id):
+        with self.lock:
+            if doc_id in self.live_docs:
+                length, terms = self.live_docs.pop(doc_id)
+                for term in terms:
+                    postings = self.live_postings[term]
+                    del postings[doc_id]
+                    if not postings:
+                        del self.live_postings[term]
+            else:
+                # a replaced base document is masked on the first update
+                length = self._base_length(doc_id)
+                if length is None or doc_id in self.deleted:
+                    return
+                self.deleted.add(doc_id)
+            self.doc_count -= 1
+            self.total_length -= length
+
+    def document_ids(self) -> set:
+        ids = set(self.base_doc_ids) - self.deleted
+        ids.update(self.live_docs)
+        return ids
+
+    def _base_length(self, doc_id):
+        i = bisect.bisect_left(self.base_doc_ids, doc_id)
+        if i < len(self.base_doc_ids) and self.base_doc_ids[i] == doc_id:
+            return self.base_doc_lengths[i]
+        return None
+
+    def _doc_length(self, doc_id):
+        if doc_id in self.live_docs:
+            return self.live_docs[doc_id][0]
+        return self._base_length(doc_id)
+
+    # search
+
+    def _postings(self, term):
+        """
+        Yield (doc id, term frequency) of all live documents with term.
+        """
+        number = self.term_numbers.get(term)
+        if number is not None:
+            start = self.term_starts[number]
+            end = self.term_starts[number + 1]
+            deleted = self.deleted
+            for doc_id, tf in zip(self.postings_ids[start:end],
+                                  self.postings_freqs[start:end]):
+                if doc_id not in deleted:
+                    yield doc_id, tf
+        yield from self.live_postings.get(term, {}).items()
+
+    def _document_frequency(self, term):
+        # upper bound: deleted base documents are counted too
+        df = len(self.live_postings.get(term, ()))
+        number = self.term_numbers.get(term)
+        if number is not None:
+            df += self.term_starts[number + 1] - self.term_starts[number]
+        return df
+
+    def _prefix_terms(self, prefix):
+        terms = []
+        i = bisect.bisect_left(self.vocabulary, prefix)
+        while (i < len(self.vocabulary) and len(terms) < MAX_PREFIX_TERMS
+               and self.vocabulary[i].startswith(prefix)):
+            terms.append(self.vocabulary[i])
+            i += 1
+        terms.extend(term for term in self.live_postings
+                     if term.startswith(prefix) and term not in terms)
+        return terms[:MAX_PREFIX_TERMS]
+
+    def _score_terms(self, terms, average_length):
+        scores = defaultdict(float)
+        for term in terms:
+            postings = list(self._postings(term))
+            df = len(postings)
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings:
+                norm = 1 - self.B + self.B * (
+                    self._doc_length(doc_id) / average_length)
+                scores[doc_id] += idf * tf * (self.K1 + 1) / (
+                    tf + self.K1 * norm)
+        return scores
+
+    def search(self, search: str, limit: int) -> list:
+        """
+        Ids of documents containing all the terms of the search phrase,
+        best BM25 score first. Prefix* terms match any term starting
+        with the prefix; phrases match documents with all their words
+        (positions are not indexed).
+        """
+        groups = []
+        for kind, text in parse_search(search):
+            if kind == 'prefix':
+                groups.append(self._prefix_terms(text.lower()))
+            else:
+                groups.extend([term] for term in analyze(text))
+        if not groups:
+            return []
+
+        with self.lock:
+            if not self.doc_count:
+                return []
+            average_length = max(self.total_length / self.doc_count, 1)
+            # rarest terms first, so candidates shrink as fast as possible
+            groups.sort(key=lambda terms: sum(
+                self._document_frequency(term) for term in terms))
+            scores = None
+            for terms in groups:
+                group_scores = self._score_terms(terms, average_length)
+                if scores is None:
+                    scores = group_scores
+                else:
+                    scores = {
+                        doc_id: score + group_scores[doc_id]
+                        for doc_id, score in scores.items()
+                        if doc_id in group_scores
+                    }
+                if not scores:
+                    return []
+        return heapq.nlargest(limit, scores,
+                              key=lambda doc_id: (scores[doc_id], doc_id))
+
+    # snapshots
+
+    def save(self, path):
+        """
+        Merge both segments and write them to a snapshot file.
+        """
+        with self.lock:
+            vocabulary = sorted(set(self.vocabulary) | set(self.live_postings))
+            term_starts = array('q', [0])
+            postings_ids = array('q')
+            postings_freqs = array('I')
+            for term in vocabulary:
+                postings = sorted(self._postings(term))
+                postings_ids.extend(doc_id for doc_id, _ in postings)
+                postings_freqs.extend(tf for _, tf in postings)
+                term_starts.append(len(postings_ids))
+
+            docs = sorted(
+                (doc_id, self._doc_length(doc_id))
+                for doc_id in self.document_ids()
+            )
+            header = {
+                'terms': vocabulary,
+                'built_on': self.built_on.isoformat(),
+                'total_length': self.total_length,
+            }
+            write_snapshot(path, header, {
+                'term_starts': term_starts,
+                'postings_ids': postings_ids,
+                'postings_freqs': postings_freqs,
+                'doc_ids': array('q', (doc_id for doc_id, _ in docs)),
+                'doc_lengths': array('I', (length for _, length in docs)),
+            })
+
+    @classmethod
+    def load(cls, path):
+        """
+        Map a snapshot written by InvertedIndex.save() into memory.
+        """
+        header, sections = read_snapshot(path)
+        index = cls()
+        index.vocabulary = header['terms']
+        index.term_numbers = {
+            term: number for number, term in enumerate(index.vocabulary)
+        }
+        index.term_starts = sections['term_starts']
+        index.postings_ids = sections['postings_ids']
+        index.postings_freqs = sections['postings_freqs']
+        index.base_doc_ids = sections['doc_ids']
+        index.base_doc_lengths = sections['doc_lengths']
+        index.built_on = parse_datetime(header['built_on'])
+        index.doc_count = len(index.base_doc_ids)
+        index.total_length = header['total_length']
+        return index
+
+
+def question_documents(question_ids=None):
+    """
+    Yield (question id, title, content with answers) for all questions
+    or the given ones. Questions and answers are streamed side by side
+    ordered by question id.
+    """
+    questions = Question.objects.order_by('id').values_list(
+        'id', 'title', 'content')
+    answers = Answer.objects.order_by('question_id').values_list(
+        'question_id', 'content')
+    if question_ids is not None:
+        questions = questions.filter(id__in=question_ids)
+        answers = answers.filter(question_id__in=question_ids)
+    answers = itertools.groupby(answers.iterator(), key=lambda row: row[0])
+    question_id, answer_rows = next(answers, (None, ()))
+    for qw_id, title, content in questions.iterator():
+        while question_id is not None and question_id < qw_id:
+            question_id, answer_rows = next(answers, (None, ()))
+        texts = [content]
+        if question_id == qw_id:
+            texts.extend(text for _, text in answer_rows)
+        yield qw_id, title, '\n'.join(texts)
+
+
+class MemoryBackend(ProcessIndex, BaseSearchBackend):
+    """
+    In-process search engine for deployments without PostgreSQL.
+    The index is loaded lazily from settings.SEARCH_INDEX_PATH (see
+    the rebuild_search_index command), or built from the database if
+    there is no snapshot, and then kept current by model signals.
+    Each worker process has its own copy of the mutable segment, which
+    follows writes made by other processes through the content version
+    (see questions.search.sync). Questions deleted elsewhere stay in the
+    index until the next snapshot, callers skip them when hydrating.
+    """
+
+    def build(self):
+        try:
+            index = InvertedIndex.load(settings.SEARCH_INDEX_PATH)
+        except (FileNotFoundError, SnapshotError):
+            return self._index_all()
+        self._catch_up(index)
+        return index
+
+    def update(self, index, since):
+        self._reindex(index, set(Question.objects.filter(
+            touched_on__gte=since).values_list('id', flat=True)))
+
+    def _index_all(self):
+        index = InvertedIndex()
+        for doc_id, title, content in question_documents():
+            index.add_document(doc_id, title, content)
+        return index
+
+    def _catch_up(self, index):
+        """
+        Apply changes made since the snapshot was built.
+        """
+        existing = set(Question.objects.values_list('id', flat=True))
+        indexed = index.document_ids()
+        for doc_id in indexed - existing:
+            index.remove_document(doc_id)
+        changed = set(Question.objects.filter(
+            touched_on__gte=index.built_on).values_list('id', flat=True))
+        self._reindex(index, changed | (existing - indexed))
+
+    def _reindex(self, index, question_ids):
+        found = set()
+        for doc_id, title, content in question_documents(question_ids):
+            index.add_document(doc_id, title, content)
+            found.add(doc_id)
+        for doc_id in set(question_ids) - found:
+            index.remove_document(doc_id)
+
+    def search(self, search, limit):
+        return self.index.search(search, limit)
+
+    def update_question(self, question_id):
+        # the index is not transactional: apply committed changes only
+        transaction.on_commit(lambda: self._apply(question_id))
+
+    def remove_question(self, question_id):
+        transaction.on_commit(lambda: self._apply(question_id))
+
+    def _apply(self, question_id):
+        with self._lock:
+            if self._index is not None:     # otherwise loaded fresh later
+                self._reindex(self._index, [question_id])
+
+    def rebuild(self):
+        index = self._index_all()
+        index.save(settings.SEARCH_INDEX_PATH)
+        with self._lock:
+            self._index = InvertedIndex.load(settings.SEARCH_INDEX_PATH)
@@ -0,0 +1,39 @@
+import re
+
+# "quoted phrase", prefix* or a plain word
+TOKEN_RE = re.compile(r'"([^"]+)"|(\w+)\*|(\w+)')
+WORD_RE = re.compile(r'\w+')
+WHITESPACE_RE = re.compile(r'\s+')
+
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how',
+    'i', 'in', 'is', 'it', 'of', 'on', 'or', 'that', 'the', 'this', 'to',
+    'was', 'what', 'with',
+))
+
+
+def parse_search(search: str) -> list:
+    """
+    Split search phrase into a list of (kind, text) tuples, where kind
+    is one of 'phrase', 'prefix' or 'word'.
+    """
+    tokens = []
+    for phrase, prefix, word in TOKEN_RE.findall(search):
+        if phrase.strip():
+            tokens.append(('phrase', phrase.strip()))
+        elif prefix:
+            tokens.append(('prefix', prefix))
+        elif word:
+            tokens.append(('word', word))
+    return tokens
+
+
+def analyze(text: str) -> list:
+    """
+    Terms of a text for in-process indexes: lowercased words without
+    the most common english stop words.
+    """
+    return [
+        word for word in WORD_RE.findall(text.lower())
+        if word not in STOP_WORDS
+    ]
@@ -0,0 +1,89 @@
+"""
+Compact on-disk snapshots of typed arrays.
+
+File layout: magic, length of the JSON header, the header itself and
+then raw array sections aligned to 8 bytes. Loading maps the file into
+memory and exposes sections as memoryviews, so the data is shared by
+all worker processes through the page cache and nothing is copied.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b'HSKSNAP1'
+LENGTH = struct.Struct('<Q')
+ALIGN = 8
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _padding(size):
+    return -size % ALIGN
+
+
+def write_snapshot(path, header: dict, arrays: dict):
+    """
+    Atomically write a snapshot.
+    * header: JSON-serializable dict
+    * arrays: mapping of section names to array.array instances
+    """
+    sections = {}
+    offset = 0
+    for name, values in arrays.items():
+        size = len(values) * values.itemsize
+        sections[name] = [offset, len(values), values.typecode]
+        offset += size + _padding(size)
+    meta = dict(header, sections=sections, byteorder=sys.byteorder,
+                itemsizes={code: array(code).itemsize for code in 'qIdf'})
+    raw_header = json.dumps(meta).encode()
+    raw_header += b' ' * _padding(len(MAGIC) + LENGTH.size + len(raw_header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(LENGTH.pack(len(raw_header)))
+            f.write(raw_header)
+            for values in arrays.values():
+                size = len(values) * values.itemsize
+                values.tofile(f)
+                f.write(b'\0' * _padding(size))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_snapshot(path):
+    """
+    Map a snapshot into memory. Return (header, sections) where
+    sections are read-only memoryviews cast to the array typecodes.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError(f'{path} is not a snapshot file')
+        size = os.fstat(f.fileno()).st_size
+        buffer = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+    header_length, = LENGTH.unpack_from(buffer, len(MAGIC))
+    start = len(MAGIC) + LENGTH.size
+    header = json.loads(bytes(buffer[start:start + header_length]))
+    if header['byteorder'] != sys.byteorder or any(
+            array(code).itemsize != itemsize
+            for code, itemsize in header['itemsizes'].items()):
+        raise SnapshotError(f'{path} was built on another platform')
+
+    data = memoryview(buffer)[start + header_length:]
+    sections = {}
+    for name, (offset, length, typecode) in header['sections'].items():
+        itemsize = array(typecode).itemsize
+        sections[name] = data[offset:offset + length * itemsize].cast(
+            typecode)
+    return header, sections
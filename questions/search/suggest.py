@@ -0,0 +1,200 @@
+"""
+Search-as-you-type suggestions of question and tag titles.
+"""
+import bisect
+import heapq
+from collections import defaultdict
+
+from questions.models import Question, Tag
+from .query import WHITESPACE_RE
+from .sync import ProcessIndex
+
+KEY_LENGTH = 40     # characters of a title kept after every word start
+MAX_SCAN = 1000     # more matching entries are not scanned, see lookup()
+BUCKET_SIZE = 50    # heaviest items kept for prefixes with more matches
+LAST_CHAR = chr(0x10ffff)
+
+
+def normalize_prefix(prefix: str) -> str:
+    return WHITESPACE_RE.sub(' ', prefix).lstrip().lower()
+
+
+def prefix_keys(title: str) -> set:
+    """
+    Keys a title is found by: its lowercased tail from every word start,
+    so that "Django ORM" is suggested for both "dja" and "orm".
+    """
+    title = normalize_prefix(title).rstrip()
+    starts = [0] + [i + 1 for i, char in enumerate(title) if char == ' ']
+    return {title[start:start + KEY_LENGTH] for start in starts} - {''}
+
+
+def _discard(array, entry):
+    i = bisect.bisect_left(array, entry)
+    if i < len(array) and array[i] == entry:
+        del array[i]
+
+
+class PrefixIndex:
+    """
+    For every kind, a sorted array of (key, id) entries. All the keys
+    starting with a prefix are adjacent, so two binary searches tell
+    how many entries match. Up to MAX_SCAN matches are scanned. For
+    prefixes with more matches the heaviest BUCKET_SIZE items are kept
+    in a bucket: filled by one scan of the range, kept up to date by
+    add() and refilled only when one of its items is removed.
+    """
+
+    def __init__(self):
+        self.entries = defaultdict(list)    # kind -> sorted (key, id)
+        self.items = {}     # (kind, id) -> (title, weight)
+        self.buckets = {}   # (kind, prefix) -> ids, heaviest first
+
+    def extend(self, kind, rows):
+        """
+        Bulk add (id, title, weight) rows of the kind, sorting once.
+        """
+        entries = self.entries[kind]
+        for item_id, title, weight in rows:
+            self.items[(kind, item_id)] = (title, weight)
+            entries.extend((key, item_id) for key in prefix_keys(title))
+        entries.sort()
+        self.buckets = {
+            bucket: ids for bucket, ids in self.buckets.items()
+            if bucket[0] != kind
+        }
+
+    def add(self, kind, item_id, title, weight):
+        self.remove(kind, item_id)
+        self.items[(kind, item_id)] = (title, weight)
+        for key in prefix_keys(title):
+            bisect.insort(self.entries[kind], (key, item_id))
+        weigh = self._weigher(kind)
+        for bucket in self._buckets_of(kind, title):
+            ids = self.buckets[bucket]
+            if len(ids) < BUCKET_SIZE or weigh(item_id) > weigh(ids[-1]):
+                ids.append(item_id)
+                ids.sort(key=weigh, reverse=True)
+                del ids[BUCKET_SIZE:]
+
+    def remove(self, kind, item_id):
+        item = self.items.get((kind, item_id))
+        if item is None:
+            return
+        for bucket in self._buckets_of(kind, item[0]):
+            if item_id in self.buckets[bucket]:
+                del self.buckets[bucket]    # refilled on the next lookup
+        del self.items[(kind, item_id)]
+        for key in prefix_keys(item[0]):
+            _discard(self.entries[kind], (key, item_id))
+
+    def lookup(self, prefix: str, limit: int) -> dict:
+        """
+        Return {kind: [(id, title), ...]} with up to <limit> items of
+        every kind having a key starting with the prefix, heaviest first.
+        """
+        prefix = normalize_prefix(prefix)
+        found = {}
+        if not prefix:
+            return found
+        for kind in self.entries:
+            start, end = self._range(kind, prefix)
+            if start == end:
+                continue
+            if end - start <= MAX_SCAN or limit > BUCKET_SIZE:
+                ids = self._scan(kind, start, end, limit)
+            else:
+                ids = self._bucket(kind, prefix, start, end)[:limit]
+            found[kind] = [
+                (item_id, self.items[(kind, item_id)][0]) for item_id in ids
+            ]
+        return found
+
+    def prime(self, length=2):
+        """
+        Fill the buckets of prefixes up to <length> characters, the
+        most expensive ones to fill on a lookup.
+        """
+        for kind, entries in self.entries.items():
+            for size in range(1, length + 1):
+                start = 0
+                while start < len(entries):
+                    prefix = entries[start][0][:size]
+                    if len(prefix) < size:      # e.g. a title ending in "a"
+                        start = bisect.bisect_left(entries, (prefix + '\0',))
+                        continue
+                    _, end = self._range(kind, prefix)
+                    if end - start > MAX_SCAN:
+                        self._bucket(kind, prefix, start, end)
+                    start = end
+
+    def _range(self, kind, prefix):
+        entries = self.entries[kind]
+        return (bisect.bisect_left(entries, (prefix,)),
+                bisect.bisect_left(entries, (prefix + LAST_CHAR,)))
+
+    def _weigher(self, kind):
+        return lambda item_id: (self.items[(kind, item_id)][1], item_id)
+
+    def _scan(self, kind, start, end, limit):
+        entries = self.entries[kind]
+        return heapq.nlargest(
+            limit, {item_id for _, item_id in entries[start:end]},
+            key=self._weigher(kind))
+
+    def _bucket(self, kind, prefix, start, end):
+        ids = self.buckets.get((kind, prefix))
+        if ids is None:
+            ids = self.buckets[(kind, prefix)] = self._scan(
+                kind, start, end, BUCKET_SIZE)
+        return ids
+
+    def _buckets_of(self, kind, title):
+        """
+        Existing buckets of the prefixes of the title keys.
+        """
+        found = set()
+        for key in prefix_keys(title):
+            for size in range(1, len(key) + 1):
+                bucket = (kind, key[:size])
+                if bucket in self.buckets:
+                    found.add(bucket)
+        return found
+
+
+class SuggestIndex(ProcessIndex):
+    """
+    Process-local PrefixIndex of question titles weighted by votes and
+    tag titles weighted by the number of questions.
+    """
+
+    def build(self):
+        index = PrefixIndex()
+        index.extend('question', Question.objects.values_list(
+            'id', 'title', 'votes').iterator())
+        index.extend('tag', Tag.objects.values_list(
+            'id', 'title', 'question_count'))
+        index.prime()
+        return index
+
+    def update(self, index, since):
+        touched = Question.objects.filter(touched_on__gte=since)
+        for row in touched.values_list('id', 'title', 'votes'):
+            index.add('question', *row)
+        tags = Tag.objects.filter(
+            id__in=Tag.questions.through.objects.filter(
+                question__in=touched).values('tag_id'))
+        for row in tags.values_list('id', 'title', 'question_count'):
+            index.add('tag', *row)
+
+    def lookup(self, prefix, limit):
+        with self._lock:
+            return self.index.lookup(prefix, limit)
+
+    def discard_question(self, question_id):
+        with self._lock:
+            if self._index is not None:
+                self._index.remove('question', question_id)
+
+
+suggestions = SuggestIndex()
@@ -0,0 +1,69 @@
+import threading
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.utils import timezone
+
+from questions.caching import get_version
+from . import CONTENT_VERSION
+
+# covers transactions which committed after a sync had started
+SYNC_MARGIN = timedelta(minutes=1)
+
+
+class ProcessIndex:
+    """
+    Base of process-local indexes over questions. The index is built on
+    first use, or by warm() when a worker starts, and then synchronized
+    with questions touched since the last sync, by any process, whenever
+    the content version changes (see questions.signals). Subclasses
+    implement build() and update().
+    """
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.RLock()
+        self._generation = None
+        self._synced_on = None
+
+    def build(self):
+        """
+        Return a new index of all the questions.
+        """
+        raise NotImplementedError
+
+    def update(self, index, since):
+        """
+        Reindex questions touched on or after <since>.
+        """
+        raise NotImplementedError
+
+    def warm(self):
+        """
+        Build the index ahead of the first request (see hasker.wsgi).
+        If the database is not available yet it is built on first use.
+        """
+        try:
+            self.index
+        except DatabaseError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._index = None
+
+    def _mark_synced(self):
+        self._generation = get_version(CONTENT_VERSION)
+        self._synced_on = timezone.now()
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                self._mark_synced()
+                self._index = self.build()
+            elif get_version(CONTENT_VERSION) != self._generation:
+                since = self._synced_on - SYNC_MARGIN
+                self._mark_synced()
+                self.update(self._index, since)
+            return self._index
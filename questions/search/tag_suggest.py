@@ -0,0 +1,207 @@
+"""
+Tag suggestions for the ask form.
+
+A batch job (the build_tag_model command) counts how often tags are
+used together and how often title terms come with every tag, and
+stores both sparse matrices in CSR form (row starts, column ids and
+counts as flat arrays) in a snapshot file. Workers map the snapshot
+and answer suggestions without touching the database.
+"""
+import bisect
+import heapq
+import os
+import threading
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+
+from questions.models import Question, Tag
+from .query import analyze
+from .snapshot import SnapshotError, read_snapshot, write_snapshot
+
+MAX_ROW_ENTRIES = 50    # most associated tags kept for a tag or a term
+MIN_TERM_COUNT = 2      # rarer title terms are not kept
+
+
+def _csr(rows: dict, keys: list, tags: dict):
+    """
+    Pack {key: Counter(tag id -> count)} into CSR arrays in keys order,
+    keeping the MAX_ROW_ENTRIES biggest counts of every row. Columns
+    of tags missing from tags (deleted meanwhile) are dropped.
+    """
+    starts, columns, counts = array('q', [0]), array('q'), array('I')
+    for key in keys:
+        items = (item for item in rows[key].items() if item[0] in tags)
+        row = sorted(heapq.nlargest(MAX_ROW_ENTRIES, items,
+                                    key=lambda item: (item[1], -item[0])))
+        columns.extend(tag_id for tag_id, _ in row)
+        counts.extend(count for _, count in row)
+        starts.append(len(columns))
+    return starts, columns, counts
+
+
+def _tagged_questions():
+    """
+    Yield (title, [tag ids]) of tagged questions, streaming questions
+    and through rows side by side ordered by question id.
+    """
+    through = Tag.questions.through.objects.order_by(
+        'question_id').values_list('question_id', 'tag_id').iterator()
+    titles = Question.objects.order_by('id').values_list(
+        'id', 'title').iterator()
+    question_id, title = next(titles, (None, None))
+    current, current_title, tag_ids = None, '', []
+    for row_question_id, tag_id in through:
+        if row_question_id != current:
+            if tag_ids:
+                yield current_title, tag_ids
+            current, tag_ids = row_question_id, []
+            while question_id is not None and question_id < current:
+                question_id, title = next(titles, (None, None))
+            current_title = title if question_id == current else ''
+        tag_ids.append(tag_id)
+    if tag_ids:
+        yield current_title, tag_ids
+
+
+def build_tag_model(path):
+    """
+    Count tag co-occurrences and term-tag associations over all the
+    tagged questions and write them to a snapshot. Return the number
+    of questions used.
+    """
+    tag_counts = Counter()
+    pairs = defaultdict(Counter)
+    term_counts = Counter()
+    term_tags = defaultdict(Counter)
+    used = 0
+    for title, tag_ids in _tagged_questions():
+        used += 1
+        tag_counts.update(tag_ids)
+        for tag_id in tag_ids:
+            for other in tag_ids:
+                if other != tag_id:
+                    pairs[tag_id][other] += 1
+        for term in set(analyze(title)):
+            term_counts[term] += 1
+            term_tags[term].update(tag_ids)
+
+    tags = dict(Tag.objects.filter(
+        id__in=list(tag_counts)).values_list('id', 'title'))
+    tag_ids = sorted(tags)
+    terms = sorted(term for term, count in term_counts.items()
+                   if count >= MIN_TERM_COUNT)
+    tag_starts, tag_columns, tag_values = _csr(pairs, tag_ids, tags)
+    term_starts, term_columns, term_values = _csr(term_tags, terms, tags)
+    write_snapshot(path, {
+        'built_on': timezone.now().isoformat(),
+        'tag_titles': [tags[tag_id] for tag_id in tag_ids],
+        'terms': terms,
+    }, {
+        'tag_ids': array('q', tag_ids),
+        'tag_counts': array('I', (tag_counts[i] for i in tag_ids)),
+        'tag_starts': tag_starts,
+        'tag_columns': tag_columns,
+        'tag_values': tag_values,
+        'term_counts': array('I', (term_counts[t] for t in terms)),
+        'term_starts': term_starts,
+        'term_columns': term_columns,
+        'term_values': term_values,
+    })
+    return used
+
+
+class TagModel:
+    """
+    Read-only view of a snapshot written by build_tag_model().
+    """
+    TERM_WEIGHT = 0.5   # title terms are weaker evidence than tags
+
+    def __init__(self, path):
+        header, self.sections = read_snapshot(path)
+        self.tag_ids = self.sections['tag_ids']
+        self.tag_titles = header['tag_titles']
+        self.tag_numbers = {
+            title.lower(): number
+            for number, title in enumerate(self.tag_titles)
+        }
+        self.term_numbers = {
+            term: number for number, term in enumerate(header['terms'])
+        }
+
+    def _row(self, prefix, number):
+        start = self.sections[f'{prefix}_starts'][number]
+        end = self.sections[f'{prefix}_starts'][number + 1]
+        return zip(self.sections[f'{prefix}_columns'][start:end],
+                   self.sections[f'{prefix}_values'][start:end])
+
+    def _title(self, tag_id):
+        i = bisect.bisect_left(self.tag_ids, tag_id)
+        return self.tag_titles[i]
+
+    def suggest(self, tags, title, limit) -> list:
+        """
+        Titles of up to <limit> tags most likely to go with the given
+        tag names and question title: sum of P(tag | given tag) and,
+        with a lower weight, of P(tag | title term).
+        """
+        scores = defaultdict(float)
+        given = set()
+        for name in tags:
+            number = self.tag_numbers.get(name.lower())
+            if number is None:
+                continue
+            given.add(self.tag_ids[number])
+            count = self.sections['tag_counts'][number]
+            for tag_id, value in self._row('tag', number):
+                scores[tag_id] += value / count
+        for term in set(analyze(title)):
+            number = self.term_numbers.get(term)
+            if number is None:
+                continue
+            count = self.sections['term_counts'][number]
+            for tag_id, value in self._row('term', number):
+                scores[tag_id] += self.TERM_WEIGHT * value / count
+        best = heapq.nlargest(
+            limit, (tag_id for tag_id in scores if tag_id not in given),
+            key=lambda tag_id: (scores[tag_id], -tag_id))
+        return [self._title(tag_id) for tag_id in best]
+
+
+class TagModelLoader:
+    """
+    Process-local TagModel, mapped again when the batch job replaces
+    the snapshot file.
+    """
+
+    def __init__(self):
+        self._model = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        path = settings.TAG_MODEL_PATH
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        self._model = TagModel(path)
+                    except SnapshotError:
+                        self._model = None
+                    self._mtime = mtime
+        return self._model
+
+    def suggest(self, tags, title, limit):
+        model = self.get()
+        if model is None:
+            return []
+        return model.suggest(tags, title, limit)
+
+
+tag_model = TagModelLoader()
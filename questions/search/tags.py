@@ -0,0 +1,127 @@
+"""
+Boolean tag queries: "tag:python tag:django -tag:flask".
+
+Every tag has a posting list, the sorted array of ids of its questions,
+cached in the shared cache under a per-tag version (bumped when the tag
+is attached to or detached from questions). Queries intersect and
+subtract these lists, so their cost depends on the size of the smallest
+included tag rather than on the size of the tables.
+"""
+import bisect
+import operator
+import re
+from array import array
+from functools import reduce
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from questions.caching import bump_version, get_version, versioned_key
+from questions.models import Tag
+from . import CONTENT_VERSION, result_cache
+
+TAG_TOKEN_RE = re.compile(r'(-?)tag:(\S+)')
+
+
+def parse_tag_query(query: str):
+    """
+    Split a normalized search phrase into (included tag names,
+    excluded tag names, the rest of the phrase).
+    """
+    include, exclude, words = [], [], []
+    for token in query.split():
+        match = TAG_TOKEN_RE.fullmatch(token)
+        if match is None:
+            words.append(token)
+        elif match.group(1):
+            exclude.append(match.group(2))
+        else:
+            include.append(match.group(2))
+    return include, exclude, ' '.join(words)
+
+
+def _postings_version(tag_id):
+    return f'tag_postings:{tag_id}'
+
+
+def invalidate_postings(tag_ids):
+    for tag_id in tag_ids:
+        bump_version(_postings_version(tag_id))
+
+
+def tag_postings(tag_id) -> array:
+    """
+    Sorted array of ids of the questions with the tag.
+    """
+    key = versioned_key(_postings_version(tag_id))
+    raw = cache.get(key)
+    ids = array('q')
+    if raw is None:
+        ids.extend(Tag.questions.through.objects.filter(
+            tag_id=tag_id).order_by('question_id').values_list(
+                'question_id', flat=True))
+        cache.set(key, ids.tobytes(), settings.TAG_POSTINGS_CACHE_TTL)
+    else:
+        ids.frombytes(raw)
+    return ids
+
+
+def contains(ids, value) -> bool:
+    i = bisect.bisect_left(ids, value)
+    return i < len(ids) and ids[i] == value
+
+
+def intersect(*lists) -> array:
+    """
+    Intersection of sorted arrays: every element of the shortest one is
+    looked up in the others with binary search.
+    """
+    shortest, *others = sorted(lists, key=len)
+    return array('q', (
+        value for value in shortest
+        if all(contains(ids, value) for ids in others)
+    ))
+
+
+def subtract(ids, *lists) -> array:
+    return array('q', (
+        value for value in ids
+        if not any(contains(other, value) for other in lists)
+    ))
+
+
+def _find_tags(names) -> dict:
+    if not names:
+        return {}
+    condition = reduce(operator.or_,
+                       (Q(title__iexact=name) for name in names))
+    return {
+        title.lower(): tag_id
+        for tag_id, title in Tag.objects.filter(condition).values_list(
+            'id', 'title')
+    }
+
+
+def tag_query_ids(include, exclude) -> array:
+    """
+    Sorted ids of questions having all the included tags and none of
+    the excluded ones. Tag names are case-insensitive.
+    """
+    key = ' '.join(sorted(f'tag:{name}' for name in include)
+                   + sorted(f'-tag:{name}' for name in exclude))
+    generation = get_version(CONTENT_VERSION)
+    ids = result_cache.get(key, generation)
+    if ids is not None:
+        return ids
+
+    tags = _find_tags(set(include) | set(exclude))
+    if not include or any(name not in tags for name in include):
+        ids = array('q')
+    else:
+        ids = intersect(*(tag_postings(tags[name]) for name in include))
+        excluded = [tag_postings(tags[name]) for name in exclude
+                    if name in tags]
+        if excluded:
+            ids = subtract(ids, *excluded)
+    return result_cache.set(key, generation, ids)
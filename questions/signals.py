@@ -0,0 +1,193 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import Profile
+
+from .models import Answer, Question, Tag
+from .caching import bump_version
+from .page_cache import pages_changed
+from .search import CONTENT_VERSION, get_backend
+from .search.suggest import suggestions
+from .search.tags import invalidate_postings
+
+
+@receiver(post_save, sender=Answer, dispatch_uid='answer_counter_add')
+def count_new_answer(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep Question.answer_count and Question.last_activity up to date
+    without reading the Answer table.
+    """
+    if not created or raw:
+        return
+    Question.objects.filter(pk=instance.question_id).update(
+        answer_count=F('answer_count') + 1,
+        last_activity=Greatest('last_activity', instance.created_on),
+        touched_on=timezone.now()
+    )
+
+
+@receiver(post_delete, sender=Answer, dispatch_uid='answer_counter_sub')
+def count_deleted_answer(sender, instance, **kwargs):
+    Question.objects.filter(pk=instance.question_id).update(
+        answer_count=F('answer_count') - 1,
+        touched_on=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Question, dispatch_uid='trending_question_add')
+def question_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Question.refresh_trending(instance)
+
+
+@receiver(post_delete, sender=Question, dispatch_uid='trending_question_del')
+def question_deleted(sender, instance, **kwargs):
+    Question.refresh_trending(instance, deleted=True)
+
+
+@receiver(post_save, sender=Question, dispatch_uid='pages_question_save')
+@receiver(post_delete, sender=Question, dispatch_uid='pages_question_del')
+def question_pages_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        pages_changed([instance.id])
+
+
+@receiver(post_save, sender=Answer, dispatch_uid='pages_answer_save')
+@receiver(post_delete, sender=Answer, dispatch_uid='pages_answer_del')
+def answer_pages_changed(sender, instance, raw=False, **kwargs):
+    # answer counters of the question are shown in the lists
+    if not raw:
+        pages_changed([instance.question_id])
+
+
+def author_pages_changed(user_id, lists):
+    question_ids = set(Question.objects.filter(
+        author_id=user_id).values_list('id', flat=True))
+    question_ids.update(Answer.objects.filter(
+        author_id=user_id).values_list('question_id', flat=True))
+    pages_changed(question_ids, lists=lists)
+
+
+@receiver(post_save, sender=User, dispatch_uid='pages_user_save')
+def user_pages_changed(sender, instance, created, raw=False,
+                       update_fields=None, **kwargs):
+    # usernames are shown on the question pages and in the lists
+    if raw or created:
+        return
+    if update_fields and 'username' not in update_fields:
+        return      # e.g. last_login on every login
+    author_pages_changed(instance.id, lists=True)
+
+
+@receiver(post_save, sender=Profile, dispatch_uid='pages_profile_save')
+def profile_pages_changed(sender, instance, created, raw=False,
+                          update_fields=None, **kwargs):
+    # avatars are shown on the question pages
+    if raw or created:
+        return
+    if update_fields and 'avatar' not in update_fields:
+        return
+    author_pages_changed(instance.user_id, lists=False)
+
+
+def content_changed():
+    # bumped after commit, so that nobody caches search results
+    # computed from the old data under the new version
+    bump_version(CONTENT_VERSION)
+
+
+@receiver(post_save, sender=Question, dispatch_uid='search_question_save')
+def index_question(sender, instance, raw=False, update_fields=None,
+                   **kwargs):
+    if raw:
+        return
+    if update_fields and not {'title', 'content'} & set(update_fields):
+        return      # e.g. votes or status changed, document is the same
+    transaction.on_commit(content_changed)
+    get_backend().update_question(instance.id)
+
+
+@receiver(post_delete, sender=Question, dispatch_uid='search_question_del')
+def unindex_question(sender, instance, **kwargs):
+    question_id = instance.id      # reset to None after deletion
+    transaction.on_commit(content_changed)
+    transaction.on_commit(
+        lambda: suggestions.discard_question(question_id))
+    get_backend().remove_question(question_id)
+
+
+@receiver(post_save, sender=Answer, dispatch_uid='search_answer_save')
+@receiver(post_delete, sender=Answer, dispatch_uid='search_answer_del')
+def index_answer(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields and 'content' not in update_fields:
+        return      # e.g. the answer was flagged, document is the same
+    transaction.on_commit(content_changed)
+    get_backend().update_question(instance.question_id)
+
+
+@receiver(post_save, sender=Tag, dispatch_uid='search_tag_save')
+def index_tag(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(content_changed)
+        pages_changed()
+
+
+@receiver(m2m_changed, sender=Tag.questions.through,
+          dispatch_uid='tag_questions_change')
+def tag_questions_changed(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """
+    Tags were attached to or detached from questions, in either
+    direction of the relation: keep Tag.question_count and
+    Tag.last_activity up to date without aggregating over the through
+    table and invalidate cached posting lists of the tags.
+    """
+    if action == 'pre_clear':
+        # remember what is going to be cleared
+        instance._cleared_tags = (
+            list(instance.tag_set.values_list('id', flat=True))
+            if reverse else [instance.id])
+        return
+    if action == 'post_clear':
+        tag_ids = instance.__dict__.pop('_cleared_tags', [])
+        if reverse:
+            Tag.objects.filter(id__in=tag_ids).update(
+                question_count=F('question_count') - 1)
+        else:
+            Tag.objects.filter(id__in=tag_ids).update(question_count=0)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        tag_ids = list(pk_set) if reverse else [instance.id]
+        delta = 1 if reverse else len(pk_set)
+        if action == 'post_add':
+            Tag.objects.filter(id__in=tag_ids).update(
+                question_count=F('question_count') + delta,
+                last_activity=timezone.now())
+        else:
+            Tag.objects.filter(id__in=tag_ids).update(
+                question_count=F('question_count') - delta)
+    else:
+        return
+    transaction.on_commit(lambda: invalidate_postings(tag_ids))
+    transaction.on_commit(content_changed)
+    if reverse:
+        pages_changed([instance.id])
+    else:
+        pages_changed(pk_set or ())
+
+
+@receiver(pre_delete, sender=Question, dispatch_uid='tag_questions_del')
+def question_untagged(sender, instance, **kwargs):
+    # through rows are deleted by cascade, without m2m_changed
+    tag_ids = list(instance.tag_set.values_list('id', flat=True))
+    if tag_ids:
+        Tag.objects.filter(id__in=tag_ids).update(
+            question_count=F('question_count') - 1)
+        transaction.on_commit(lambda: invalidate_postings(tag_ids))
@@ -0,0 +1,13 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def vote_of(votes: dict, object_id):
+    """
+    Vote of the viewer for an object from a dict of votes by object id
+    (see Vote.user_votes), 0 if there is none.
+    Usage: {{ answer_votes|vote_of:answer.id }}
+    """
+    return votes.get(object_id, 0)
@@ -0,0 +1,223 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+
+from questions.management.commands.reconcile_votes import (
+    read_checkpoint, write_checkpoint)
+from questions.models import Answer, Question, QuestionVote, Tag, Vote
+
+
+class TestRebuildQuestionCounters(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.sam.save()
+        cls.questions = []
+        for i in range(5):
+            qw = Question(title=f'Question {i}', author=cls.sam,
+                          content='Lorem ipsum')
+            qw.save()
+            cls.questions.append(qw)
+
+    def test_counters_follow_answers(self):
+        qw = self.questions[0]
+        answer = Answer(author=self.sam, question=qw, content='Lorem')
+        answer.save()
+        qw.refresh_from_db()
+        self.assertEqual(qw.answer_count, 1)
+        self.assertEqual(qw.last_activity, answer.created_on)
+
+        answer.delete()
+        qw.refresh_from_db()
+        self.assertEqual(qw.answer_count, 0)
+
+    def test_rebuild_drifted_counters(self):
+        '''
+        Bulk created answers bypass signals, the command fixes counters
+        '''
+        Answer.objects.bulk_create([
+            Answer(author=self.sam, question=qw, content=f'Answer {j}')
+            for i, qw in enumerate(self.questions) for j in range(i)
+        ])
+        self.assertFalse(
+            Question.objects.filter(answer_count__gt=0).exists())
+
+        out = StringIO()
+        call_command('rebuild_question_counters', batch_size=2, stdout=out)
+        self.assertIn('5 question(s)', out.getvalue())
+        for i, qw in enumerate(self.questions):
+            with self.subTest(i=i):
+                qw.refresh_from_db()
+                self.assertEqual(qw.answer_count, i)
+                self.assertEqual(qw.answer_count, qw.get_answers_number())
+                if i:
+                    last_answer = qw.answer_set.latest('created_on')
+                    self.assertEqual(qw.last_activity,
+                                     last_answer.created_on)
+
+
+class TestRebuildTagCounters(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.questions = Question.objects.bulk_create([
+            Question(title=f'Question {i}', author=cls.sam,
+                     content='Lorem ipsum')
+            for i in range(4)
+        ])
+        cls.python = Tag.objects.create(title='Python')
+        cls.django = Tag.objects.create(title='django')
+
+    def counts(self):
+        return dict(Tag.objects.values_list('title', 'question_count'))
+
+    def test_counters_follow_tagging(self):
+        '''
+        Both directions of the relation, clear() and question deletion
+        '''
+        q0, q1, q2, q3 = self.questions
+        self.python.questions.add(q0, q1, q2)
+        q0.tag_set.add(self.django, self.python)    # python is already set
+        self.assertEqual(self.counts(), {'Python': 3, 'django': 1})
+        self.python.questions.remove(q1)
+        q3.tag_set.add(self.django)
+        self.assertEqual(self.counts(), {'Python': 2, 'django': 2})
+        q0.tag_set.clear()
+        self.assertEqual(self.counts(), {'Python': 1, 'django': 1})
+        q2.delete()
+        self.assertEqual(self.counts(), {'Python': 0, 'django': 1})
+        self.django.questions.clear()
+        self.assertEqual(self.counts(), {'Python': 0, 'django': 0})
+
+    def test_rebuild_drifted_counters(self):
+        '''
+        Bulk created through rows bypass signals, the command fixes them
+        '''
+        Tag.questions.through.objects.bulk_create([
+            Tag.questions.through(tag=self.python, question=qw)
+            for qw in self.questions
+        ] + [Tag.questions.through(tag=self.django,
+                                   question=self.questions[1])])
+        self.assertEqual(self.counts(), {'Python': 0, 'django': 0})
+
+        out = StringIO()
+        call_command('rebuild_tag_counters', batch_size=1, stdout=out)
+        self.assertIn('2 tag(s)', out.getvalue())
+        self.assertEqual(self.counts(), {'Python': 4, 'django': 1})
+        self.django.refresh_from_db()
+        self.assertEqual(self.django.last_activity,
+                         self.questions[1].created_on)
+
+
+class TestReconcileVotes(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.alice = User.objects.create_user(
+            username='Alice',
+            email='alice@wonderland.com',
+            password='alicepass'
+        )
+        cls.questions = [
+            Question.objects.create(title=f'Question {i}', author=cls.sam,
+                                    content='Lorem ipsum')
+            for i in range(5)
+        ]
+        cls.answer = Answer.objects.create(
+            author=cls.sam, question=cls.questions[0], content='Lorem')
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.checkpoint = os.path.join(directory, 'reconcile_votes.json')
+        settings = override_settings(VOTE_RECONCILE_CHECKPOINT=self.checkpoint)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def reconcile(self, **options):
+        out = StringIO()
+        options.setdefault('sleep', 0)
+        call_command('reconcile_votes', batch_size=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_drifted_counters_are_fixed(self):
+        for qw in self.questions[:3]:
+            Vote.register_vote(qw, self.alice.id, vote=1)
+        Vote.register_vote(self.answer, self.alice.id, vote=0)
+        # counters drift, e.g. after a crash in buffered mode
+        Question.objects.filter(pk=self.questions[0].pk).update(votes=7)
+        Question.objects.filter(pk=self.questions[4].pk).update(votes=-2)
+        Answer.objects.update(votes=0)
+
+        output = self.reconcile(dry_run=True)
+        self.assertIn('Questions: 2 counter(s) fixed', output)
+        self.assertIn('Answers: 1 counter(s) fixed', output)
+        self.assertEqual(Question.objects.get(pk=self.questions[0].pk).votes,
+                         7)
+
+        self.reconcile()
+        self.assertEqual(
+            list(Question.objects.order_by('pk').values_list(
+                'votes', flat=True)), [1, 1, 1, 0, 0])
+        self.assertEqual(Answer.objects.get().votes, -1)
+        self.assertIn('Questions: 0 counter(s) fixed', self.reconcile())
+
+    def test_empty_votes_are_deleted(self):
+        Vote.register_vote(self.questions[1], self.alice.id, vote=1)
+        Vote.register_vote(self.questions[1], self.alice.id, vote=0)
+        Vote.register_vote(self.questions[2], self.alice.id, vote=1)
+        self.assertIn('1 empty vote(s) deleted', self.reconcile())
+        self.assertEqual(list(QuestionVote.objects.values_list(
+            'question_id', flat=True)), [self.questions[2].pk])
+
+    def test_resume(self):
+        Question.objects.update(votes=3)
+        # an interrupted run has checked the first three questions
+        write_checkpoint(self.checkpoint, {'question': self.questions[2].pk})
+        self.assertIn('Questions: 2 counter(s) fixed',
+                      self.reconcile(resume=True))
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.assertEqual(Question.objects.filter(votes=3).count(), 3)
+
+    def test_interrupt(self):
+        '''
+        An interrupted run reports the last checked id and leaves it in
+        the checkpoint file for --resume
+        '''
+        Question.objects.update(votes=3)
+        with mock.patch('time.sleep', side_effect=[None, KeyboardInterrupt]):
+            with self.assertRaisesMessage(
+                    CommandError,
+                    f'questions checked up to id {self.questions[3].pk}'):
+                self.reconcile(sleep=1)
+        self.assertEqual(read_checkpoint(self.checkpoint),
+                         {'question': self.questions[3].pk})
+        self.assertEqual(Question.objects.filter(votes=3).count(), 1)
+
+        self.assertIn('Questions: 1 counter(s) fixed',
+                      self.reconcile(resume=True))
+        self.assertFalse(Question.objects.filter(votes=3).exists())
+        self.assertFalse(os.path.exists(self.checkpoint))
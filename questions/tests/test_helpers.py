@@ -1,5 +1,6 @@
 import random
 from datetime import datetime, timezone, timedelta
+from unittest.mock import patch
 
 from django.test import TestCase
 from django.contrib.auth.models import User
@@ -69,6 +70,43 @@ class TestSaveTagHelper(TestCase):
             self.fail('Save_tags did not created tags')
         self.assertEqual(self.q.tags.all().count(), 3)
 
+    def test_queries_do_not_depend_on_number_of_tags(self):
+        '''
+        Lookup, creation of missing tags, their ids, through rows and
+        tag counters
+        '''
+        Tag(title='Lorem').save()
+        with self.assertNumQueries(6):
+            save_tags('Python Lorem Otus Ipsum'.split(), self.q, Tag)
+        self.assertEqual(
+            sorted(tag.title for tag in self.q.tags.all()),
+            ['Ipsum', 'Lorem', 'Otus', 'Python'])
+        with self.assertNumQueries(2):     # nothing new to insert
+            save_tags('Python Lorem'.split(), self.q, Tag)
+
+    def test_duplicates_and_blanks(self):
+        save_tags(['Otus', ' Otus ', '', 'Python'], self.q, Tag)
+        self.assertEqual(Tag.objects.filter(title='Otus').count(), 1)
+        self.assertEqual(self.q.tags.all().count(), 2)
+        save_tags([], self.q, Tag)
+        self.assertEqual(self.q.tags.all().count(), 2)
+
+    def test_tag_created_concurrently(self):
+        '''
+        Tag created by somebody else after the lookup is reused
+        '''
+        real_bulk_create = Tag.objects.bulk_create
+
+        def bulk_create(objs, **kwargs):
+            Tag(title='Otus').save()    # another asker was faster
+            return real_bulk_create(objs, **kwargs)
+
+        with patch.object(Tag.objects, 'bulk_create', bulk_create):
+            save_tags(['Otus'], self.q, Tag)
+        self.assertEqual(Tag.objects.filter(title='Otus').count(), 1)
+        self.assertEqual(list(self.q.tags.all()),
+                         [Tag.objects.get(title='Otus')])
+
 
 class TestTimediffHelper(TestCase):
 
@@ -1,12 +1,17 @@
 import random
 
-from django.test import TestCase
-from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.contrib.auth.models import AnonymousUser, User
 from django.utils.lorem_ipsum import words, paragraphs
 from django.conf import settings
-from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
 
-from questions.models import Question, Answer, Tag, Voters
+from hasker.context_processors.trending_questions import get_trends
+from questions.models import (Question, Answer, AnswerVote, QuestionVote,
+                              Tag, Vote)
+from questions.ranking import recompute_hot_scores
 
 
 class TestQuestion(TestCase):
@@ -92,12 +97,93 @@ class TestQuestion(TestCase):
             Question.objects.all().count(),
             settings.TRENDING_QUESTIONS_NUMBER + 15)
 
+        recompute_hot_scores()
         trending_qws = Question.trending()
         self.assertEqual(len(trending_qws), settings.TRENDING_QUESTIONS_NUMBER)
 
-        last_rating = trending_qws[0].votes  # rating of the top No 1 question
+        # rating of the top No 1 question
+        last_rating = trending_qws[0].hot_score
         for qw in trending_qws[1:]:
-            self.assertLessEqual(qw.votes, last_rating)
+            self.assertLessEqual(qw.hot_score, last_rating)
+
+
+class TestTrendingCache(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.sam.save()
+        cls.alice = User.objects.create_user(
+            username='Alice',
+            email='alice@wonderland.com',
+            password='alicepass'
+        )
+        cls.alice.save()
+        Question.objects.bulk_create([
+            Question(title=f'Question {i}', author=cls.sam,
+                     content='Lorem ipsum', votes=i, hot_score=i)
+            for i in range(settings.TRENDING_QUESTIONS_NUMBER + 10)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_trending_is_lazy(self):
+        request = RequestFactory().get('/users/login')
+        with self.assertNumQueries(0):
+            context = get_trends(request)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(context['trending']),
+                             settings.TRENDING_QUESTIONS_NUMBER)
+
+    def test_trending_is_cached(self):
+        with self.assertNumQueries(1):
+            trending = Question.cached_trending()
+        with self.assertNumQueries(0):
+            self.assertEqual(Question.cached_trending(), trending)
+        self.assertEqual(
+            [trend['id'] for trend in trending],
+            [qw.id for qw in Question.trending()]
+        )
+
+    def test_vote_outside_top_keeps_cache(self):
+        Question.cached_trending()
+        worst = Question.objects.order_by('hot_score').first()
+        Vote.register_vote(worst, self.alice.id, vote=1)
+        with self.assertNumQueries(0):
+            Question.cached_trending()
+
+    def test_rescoring_invalidates_cache(self):
+        trending = Question.cached_trending()
+        worst = Question.objects.order_by('hot_score').first()
+        for _ in range(10):
+            Answer(author=self.alice, question=worst,
+                   content=words(5, common=False)).save()
+        Vote.register_vote(worst, self.alice.id, vote=1)
+        with self.assertNumQueries(0):
+            self.assertEqual(Question.cached_trending(), trending)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recompute_hot_scores()
+        with self.assertNumQueries(1):
+            trending = Question.cached_trending()
+        # question with a vote and a lot of answers enters the top
+        self.assertIn(worst.id, [trend['id'] for trend in trending])
+
+    def test_vote_inside_top_invalidates_cache(self):
+        trending = Question.cached_trending()
+        top = Question.objects.get(pk=trending[0]['id'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.register_vote(top, self.alice.id, vote=1)
+            # invalidated after commit, the old list is kept meanwhile
+            with self.assertNumQueries(0):
+                self.assertEqual(Question.cached_trending(), trending)
+        self.assertEqual(Question.cached_trending()[0]['votes'],
+                         trending[0]['votes'] + 1)
 
 
 class TestAnswers(TestCase):
@@ -304,7 +390,7 @@ class TestTag(TestCase):
         self.assertEqual(str(self.tag), 'Python')
 
 
-class TestVoters(TestCase):
+class TestVotes(TestCase):
 
     @classmethod
     def setUpTestData(cls):
@@ -333,117 +419,156 @@ class TestVoters(TestCase):
         )
         cls.a.save()
 
+    def user_vote(self, object, user):
+        if isinstance(object, Question):
+            return QuestionVote.objects.get(question=object, user=user).vote
+        return AnswerVote.objects.get(answer=object, user=user).vote
+
     def test_basic_votes_creation_question(self):
-        vote = Voters(content_object=self.q, user_id=self.sam.id)
-        vote.save()
-        object_ct = ContentType.objects.get_for_model(self.q)
+        QuestionVote(question=self.q, user=self.sam).save()
         self.assertEqual(
-            Voters.objects.filter(
-                content_type=object_ct,
-                object_id=self.q.id,
-                user_id=self.sam.id
-            ).count(), 1)
-        retrieved_vote = Voters.objects.get(
-            content_type=object_ct,
-            object_id=self.q.id,
-            user_id=self.sam.id
-        )
+            QuestionVote.objects.filter(question=self.q,
+                                        user=self.sam).count(), 1)
+        retrieved_vote = QuestionVote.objects.get(question=self.q,
+                                                  user=self.sam)
         self.assertEqual(retrieved_vote.user_id,
                          self.sam.id)
-        self.assertEqual(retrieved_vote.object_id,
+        self.assertEqual(retrieved_vote.question_id,
                          self.q.id)
         self.assertEqual(retrieved_vote.vote, 0)
 
     def test_register_q_upvote(self):
-        Voters.register_vote(self.q, self.sam.id, vote=1)
-        object_ct = ContentType.objects.get_for_model(self.q)
-        retrieved_vote = Voters.objects.get(
-            content_type=object_ct,
-            object_id=self.q.id,
-            user_id=self.sam.id
-        )
-        self.assertEqual(retrieved_vote.vote, 1)
+        Vote.register_vote(self.q, self.sam.id, vote=1)
+        self.assertEqual(self.user_vote(self.q, self.sam), 1)
 
     def test_register_q_downvote(self):
-        Voters.register_vote(self.q, self.sam.id, vote=0)
-        object_ct = ContentType.objects.get_for_model(self.q)
-        retrieved_vote = Voters.objects.get(
-            content_type=object_ct,
-            object_id=self.q.id,
-            user_id=self.sam.id
-        )
-        self.assertEqual(retrieved_vote.vote, -1)
+        Vote.register_vote(self.q, self.sam.id, vote=0)
+        self.assertEqual(self.user_vote(self.q, self.sam), -1)
 
     def test_register_ans_upvote(self):
-        Voters.register_vote(self.a, self.sam.id, vote=1)
-        object_ct = ContentType.objects.get_for_model(self.a)
-        retrieved_vote = Voters.objects.get(
-            content_type=object_ct,
-            object_id=self.a.id,
-            user_id=self.sam.id
-        )
-        self.assertEqual(retrieved_vote.vote, 1)
+        Vote.register_vote(self.a, self.sam.id, vote=1)
+        self.assertEqual(self.user_vote(self.a, self.sam), 1)
 
     def test_register_ans_downvote(self):
-        Voters.register_vote(self.a, self.sam.id, vote=0)
-        object_ct = ContentType.objects.get_for_model(self.a)
-        retrieved_vote = Voters.objects.get(
-            content_type=object_ct,
-            object_id=self.a.id,
-            user_id=self.sam.id
-        )
-        self.assertEqual(retrieved_vote.vote, -1)
+        Vote.register_vote(self.a, self.sam.id, vote=0)
+        self.assertEqual(self.user_vote(self.a, self.sam), -1)
+
+    def test_vote_keeps_answer_counter(self):
+        '''
+        Voting with a stale question instance does not overwrite
+        counters maintained in the database
+        '''
+        stale_question = Question.objects.get(pk=self.q.id)
+        Answer(author=self.alice, question=self.q, content='Lorem').save()
+        Vote.register_vote(stale_question, self.alice.id, vote=1)
+        fresh_question = Question.objects.get(pk=self.q.id)
+        self.assertEqual(fresh_question.votes, 1)
+        self.assertEqual(fresh_question.answer_count,
+                         fresh_question.get_answers_number())
 
     def test_register_assert_integrity_answers(self):
         '''
         Check that user upvote and downvote only in corridor (-1, 0, 1)
         '''
         def check(object: Answer or Question):
-            first_upvote = Voters.register_vote(object, self.sam.id, vote=1)
-            second_upvote = Voters.register_vote(object, self.sam.id, vote=1)
+            first_upvote = Vote.register_vote(object, self.sam.id, vote=1)
+            second_upvote = Vote.register_vote(object, self.sam.id, vote=1)
             self.assertTrue(first_upvote)
             self.assertFalse(second_upvote)
-            object_ct = ContentType.objects.get_for_model(object)
-            retrieved_vote = Voters.objects.get(
-                content_type=object_ct,
-                object_id=object.id,
-                user_id=self.sam.id
-            )
-            self.assertEqual(retrieved_vote.vote, 1)  # now vote is 1
+            # now vote is 1
+            self.assertEqual(self.user_vote(object, self.sam), 1)
             self.assertEqual(object.votes, 1)
 
-            first_downvote = Voters.register_vote(object, self.sam.id, vote=0)
-            second_downvote = Voters.register_vote(object, self.sam.id, vote=0)
-            third_downvote = Voters.register_vote(object, self.sam.id, vote=0)
+            first_downvote = Vote.register_vote(object, self.sam.id, vote=0)
+            second_downvote = Vote.register_vote(object, self.sam.id, vote=0)
+            third_downvote = Vote.register_vote(object, self.sam.id, vote=0)
             self.assertTrue(first_downvote)
             self.assertTrue(second_downvote)
             self.assertFalse(third_downvote)
-            retrieved_vote = Voters.objects.get(
-                content_type=object_ct,
-                object_id=object.id,
-                user_id=self.sam.id
-            )
-            self.assertEqual(retrieved_vote.vote, -1)  # now vote is -1
+            # now vote is -1
+            self.assertEqual(self.user_vote(object, self.sam), -1)
             self.assertEqual(object.votes, -1)
 
-            first_upvote = Voters.register_vote(object, self.sam.id, vote=1)
-            second_upvote = Voters.register_vote(object, self.sam.id, vote=1)
-            third_upvote = Voters.register_vote(object, self.sam.id, vote=1)
+            first_upvote = Vote.register_vote(object, self.sam.id, vote=1)
+            second_upvote = Vote.register_vote(object, self.sam.id, vote=1)
+            third_upvote = Vote.register_vote(object, self.sam.id, vote=1)
             self.assertTrue(first_upvote)
             self.assertTrue(second_upvote)
             self.assertFalse(third_upvote)
-            retrieved_vote = Voters.objects.get(
-                content_type=object_ct,
-                object_id=object.id,
-                user_id=self.sam.id
-            )
-            self.assertEqual(retrieved_vote.vote, 1)  # vote again is 1
+            # vote again is 1
+            self.assertEqual(self.user_vote(object, self.sam), 1)
             self.assertEqual(object.votes, 1)
 
-            alice_voted = Voters.register_vote(object, self.alice.id, vote=1)
+            alice_voted = Vote.register_vote(object, self.alice.id, vote=1)
             self.assertTrue(alice_voted)  # Alice still can vote after Sam
             self.assertEqual(object.votes, 2)
 
         for obj in (self.q, self.a):     # for Questions and for Answers
             with self.subTest(obj=obj):
                 check(obj)
+
+    def statements(self, context):
+        return [query['sql'] for query in context.captured_queries
+                if 'SAVEPOINT' not in query['sql']]
+
+    def test_vote_takes_two_statements(self):
+        '''
+        A vote is an upsert of the vote row plus one counter UPDATE,
+        the content of the object is never rewritten
+        '''
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(
+                Vote.register_vote(self.q, self.alice.id, vote=1))
+        statements = self.statements(context)
+        self.assertEqual(len(statements), 2)
+        self.assertIn('ON CONFLICT', statements[0])
+        self.assertNotIn('content', statements[1].split('WHERE')[0])
+
+    def test_rejected_vote_skips_counter(self):
+        Vote.register_vote(self.a, self.alice.id, vote=0)
+        with CaptureQueriesContext(connection) as context:
+            self.assertFalse(
+                Vote.register_vote(self.a, self.alice.id, vote=0))
+        self.assertEqual(len(self.statements(context)), 1)
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.votes, -1)
+
+    def test_one_row_per_user_and_object(self):
+        Vote.register_vote(self.q, self.alice.id, vote=1)
+        Vote.register_vote(self.q, self.alice.id, vote=0)
+        Vote.register_vote(self.q, self.alice.id, vote=0)
+        self.assertEqual(QuestionVote.objects.filter(
+            question=self.q, user=self.alice).count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            QuestionVote(question=self.q, user=self.alice).save()
+
+    def test_votes_are_deleted_with_objects(self):
+        Vote.register_vote(self.q, self.alice.id, vote=1)
+        Vote.register_vote(self.a, self.alice.id, vote=1)
+        self.alice.delete()
+        self.assertFalse(QuestionVote.objects.exists())
+        self.assertFalse(AnswerVote.objects.exists())
+
+    def test_user_votes_single_query(self):
+        bob = User.objects.create_user(username='Bob', password='bobpass')
+        answers = [self.a] + [
+            Answer.objects.create(author=self.sam, question=self.q,
+                                  content=f'Answer {i}')
+            for i in range(3)
+        ]
+        Vote.register_vote(self.q, bob.id, vote=1)
+        Vote.register_vote(answers[0], bob.id, vote=0)
+        Vote.register_vote(answers[2], bob.id, vote=1)
+        Vote.register_vote(answers[3], self.alice.id, vote=1)
+        with self.assertNumQueries(1):
+            question_vote, answer_votes = Vote.user_votes(
+                bob, self.q, answers)
+        self.assertEqual(question_vote, 1)
+        self.assertEqual(answer_votes, {answers[0].id: -1,
+                                        answers[2].id: 1})
+        with self.assertNumQueries(1):
+            self.assertEqual(Vote.user_votes(self.alice, self.q, []),
+                             (0, {}))
+        with self.assertNumQueries(0):
+            self.assertEqual(Vote.user_votes(AnonymousUser(), self.q,
+                                             answers), (0, {}))
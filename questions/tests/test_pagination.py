@@ -0,0 +1,250 @@
+import base64
+import json
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+
+from questions.models import Question
+from questions.pagination import (CursorPaginator, EstimatedCountPaginator,
+                                  IdCursorPaginator, WindowedPaginator)
+
+
+class TestCursorPaginator(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.sam.save()
+        Question.objects.bulk_create([
+            Question(
+                title=f'Question {i:02}',
+                author=cls.sam,
+                content='Lorem ipsum dolor est',
+                votes=i % 4    # a lot of equal ratings
+            ) for i in range(23)
+        ])
+        # make some questions share the same creation date
+        moment = datetime(2022, 3, 1, tzinfo=timezone.utc)
+        for i, qw in enumerate(Question.objects.order_by('title')):
+            qw.created_on = moment - timedelta(days=i // 3)
+            qw.save()
+
+    def walk_forward(self, paginator):
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return pages
+
+    def test_pages_follow_ordering(self):
+        for ordering in (('-created_on', 'title'), ('-votes', 'title')):
+            with self.subTest(ordering=ordering):
+                paginator = CursorPaginator(
+                    Question.objects.all(), 5, ordering=ordering)
+                pages = self.walk_forward(paginator)
+                self.assertEqual([len(p) for p in pages], [5, 5, 5, 5, 3])
+                self.assertEqual([p.number for p in pages], [1, 2, 3, 4, 5])
+                walked = [qw.id for page in pages for qw in page]
+                expected = list(Question.objects.order_by(
+                    *ordering).values_list('id', flat=True))
+                self.assertEqual(walked, expected)
+
+    def test_going_back(self):
+        paginator = CursorPaginator(
+            Question.objects.all(), 5, ordering=('-votes', 'title'))
+        pages = self.walk_forward(paginator)
+        page = pages[-1]
+        self.assertFalse(page.has_next())
+        for expected in reversed(pages[:-1]):
+            page = paginator.get_page(page.previous_cursor)
+            self.assertEqual(page.number, expected.number)
+            self.assertEqual(list(page), list(expected))
+        self.assertFalse(page.has_previous())
+
+    def test_id_list(self):
+        '''
+        Cursor pages over a sorted id list, highest id first
+        '''
+        ids = sorted(Question.objects.filter(
+            votes__gt=0).values_list('id', flat=True))
+        paginator = IdCursorPaginator(ids, 5, Question.objects.all())
+        with self.assertNumQueries(1):
+            self.assertEqual([qw.id for qw in paginator.get_page()],
+                             ids[::-1][:5])
+        pages = self.walk_forward(paginator)
+        self.assertEqual([len(p) for p in pages], [5, 5, 5, 2])
+        self.assertEqual([qw.id for page in pages for qw in page], ids[::-1])
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = paginator.get_page(page.previous_cursor)
+            self.assertEqual(page.number, expected.number)
+            self.assertEqual(list(page), list(expected))
+        self.assertFalse(page.has_previous())
+        self.assertFalse(IdCursorPaginator(
+            [], 5, Question.objects.all()).get_page().has_next())
+
+    def test_broken_cursor_gives_first_page(self):
+        paginator = CursorPaginator(
+            Question.objects.all(), 5, ordering=('-created_on', 'title'))
+        first_page = paginator.get_page()
+        for cursor in ('', 'abrakadabra', 'WzEsMF0', 'W10', '!!!'):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual(page.number, 1)
+                self.assertEqual(list(page), list(first_page))
+
+    def test_tampered_cursor_gives_first_page(self):
+        '''
+        Well-formed cursors with values of wrong types or nulls
+        '''
+        def cursor(data):
+            raw = json.dumps(data).encode()
+            return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+        tampered = [
+            [2, 0, [[1], 'x']], [True, 0, [1, 'x']], [2, 0, [None, 'x']],
+            [2, 0, ['2022-03-01', None]], [2, 5, ['2022-03-01', 'x']],
+            [2, 0, [{}, 'x']], [2, 0, [True, 'x']],
+        ]
+        paginator = CursorPaginator(
+            Question.objects.all(), 5, ordering=('-created_on', 'title'))
+        ids = sorted(Question.objects.values_list('id', flat=True))
+        id_paginator = IdCursorPaginator(ids, 5, Question.objects.all())
+        for data in tampered + [[2, 0, [None]], [2, 0, ['x']]]:
+            for pager in (paginator, id_paginator):
+                with self.subTest(cursor=data, paginator=pager):
+                    self.assertEqual(pager.get_page(cursor(data)).number, 1)
+        for data in tampered:
+            with self.subTest(cursor=data):
+                response = self.client.get('/questions/',
+                                           {'cursor': cursor(data)})
+                self.assertEqual(response.status_code, 200)
+
+    def test_page_costs_the_same(self):
+        '''
+        Deep pages need a single query with no COUNT(*)
+        '''
+        paginator = CursorPaginator(
+            Question.objects.all(), 5, ordering=('-created_on', 'title'))
+        pages = self.walk_forward(paginator)
+        with self.assertNumQueries(1):
+            page = paginator.get_page(pages[-2].next_cursor)
+            self.assertEqual(len(page), 3)
+
+
+class TestWindowedPaginator(TestCase):
+
+    def test_page_window_is_elided(self):
+        paginator = WindowedPaginator(range(1000), 10)
+        window = list(paginator.get_page(50).page_window)
+        self.assertEqual(
+            window,
+            [1, paginator.ELLIPSIS, 48, 49, 50, 51, 52,
+             paginator.ELLIPSIS, 100]
+        )
+
+
+class TestEstimatedCountPaginator(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.sam.save()
+        Question.objects.bulk_create([
+            Question(title=f'Question {i:02}', author=cls.sam,
+                     content='Lorem ipsum dolor est', votes=i % 4)
+            for i in range(30)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_exact_count_is_cached_per_filter(self):
+        # on PostgreSQL the planner is asked first, then rows are counted
+        queries = 2 if connection.vendor == 'postgresql' else 1
+        queryset = Question.objects.order_by('title')
+        with self.assertNumQueries(queries):
+            paginator = EstimatedCountPaginator(queryset, 10)
+            self.assertEqual(paginator.count, 30)
+            self.assertFalse(paginator.count_is_estimate)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                EstimatedCountPaginator(queryset, 10).count, 30)
+        with self.assertNumQueries(queries):
+            paginator = EstimatedCountPaginator(
+                queryset.filter(votes=0), 10)
+            self.assertEqual(paginator.count, 8)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=100)
+    def test_estimate_above_threshold(self):
+        queryset = Question.objects.order_by('title')
+        with patch.object(EstimatedCountPaginator, '_estimate_count',
+                          return_value=12345):
+            paginator = EstimatedCountPaginator(queryset, 10)
+            self.assertEqual(paginator.count, 12345)
+            self.assertTrue(paginator.count_is_estimate)
+            paginator = EstimatedCountPaginator(queryset, 1)
+            page = paginator.get_page(20)
+            self.assertEqual(page.object_list[0].title, 'Question 19')
+            self.assertTrue(page.has_next())
+            window = list(page.page_window)
+            # last page is not linked for estimated totals
+            self.assertEqual(window[-1], paginator.ELLIPSIS)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=10)
+    def test_pages_past_underestimate(self):
+        '''
+        Rows past an underestimated total are still reachable, the
+        last page knows the exact total
+        '''
+        queryset = Question.objects.order_by('title')
+        with patch.object(EstimatedCountPaginator, '_estimate_count',
+                          return_value=12):
+            paginator = EstimatedCountPaginator(queryset, 10)
+            page = paginator.get_page(2)
+            self.assertTrue(page.has_next())
+            page = paginator.get_page(3)
+            self.assertEqual(len(page), 10)
+            self.assertFalse(page.has_next())
+            self.assertEqual(paginator.count, 30)
+            self.assertFalse(paginator.count_is_estimate)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=100)
+    def test_pages_past_overestimate(self):
+        queryset = Question.objects.order_by('title')
+        with patch.object(EstimatedCountPaginator, '_estimate_count',
+                          return_value=12345):
+            paginator = EstimatedCountPaginator(queryset, 10)
+            self.assertEqual(paginator.get_page(50).number, 1)
+            self.assertFalse(paginator.get_page(3).has_next())
+
+    @unittest.skipUnless(connection.vendor == 'postgresql',
+                         'row estimates are read on PostgreSQL only')
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=1)
+    def test_planner_estimate(self):
+        with self.assertNumQueries(1):     # EXPLAIN only
+            paginator = EstimatedCountPaginator(
+                Question.objects.order_by('title'), 10)
+            self.assertGreater(paginator.count, 0)
+            self.assertTrue(paginator.count_is_estimate)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=100)
+    def test_exact_count_below_threshold(self):
+        queryset = Question.objects.order_by('title')
+        with patch.object(EstimatedCountPaginator, '_estimate_count',
+                          return_value=40):
+            paginator = EstimatedCountPaginator(queryset, 10)
+            self.assertEqual(paginator.count, 30)
+            self.assertFalse(paginator.count_is_estimate)
@@ -0,0 +1,116 @@
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from questions.models import Answer, Question, Tag
+from questions.search import result_cache
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql',
+                     'EXPLAIN plans are checked on PostgreSQL only')
+class TestHotQueryPlans(TestCase):
+    '''
+    Run EXPLAIN for every query of the hot views and make sure none of
+    them reads a whole table. Sequential scans are disabled for the
+    planner, so it falls back to them only if no index is usable.
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.alice = User.objects.create_user(
+            username='Alice',
+            email='alice@wonderland.com',
+            password='alicepass'
+        )
+        cls.bob = User.objects.create_user(
+            username='Bob',
+            email='bob@bobpost.org',
+            password='bobpass'
+        )
+        Question.objects.bulk_create([
+            Question(title=f'Question {i}', author=cls.sam,
+                     content='Lorem ipsum dolor est', votes=i % 17)
+            for i in range(500)
+        ])
+        cls.q = Question.objects.order_by('id').first()
+        Answer.objects.bulk_create([
+            Answer(author=cls.alice, question=cls.q,
+                   content=f'Answer {i}', votes=i % 5)
+            for i in range(50)
+        ])
+        cls.tag = Tag(title='Python')
+        cls.tag.save()
+        cls.tag.questions.add(*Question.objects.all()[:100])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def assertNoSeqScans(self, request, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = request(*args, **kwargs)
+        self.assertLess(response.status_code, 400)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with self.subTest(sql=sql):
+                plan = self.explain(sql)
+                self.assertNotIn('Seq Scan', plan)
+
+    def test_index(self):
+        response = self.client.get('/questions/')
+        next_cursor = response.context['page_obj'].next_cursor
+        for params in ({}, {'cursor': next_cursor}):
+            self.assertNoSeqScans(self.client.get, '/questions/', params)
+
+    def test_index_hot(self):
+        response = self.client.get('/questions/hot')
+        next_cursor = response.context['page_obj'].next_cursor
+        for params in ({}, {'cursor': next_cursor}):
+            self.assertNoSeqScans(self.client.get, '/questions/hot', params)
+
+    def test_search_tag(self):
+        self.assertNoSeqScans(self.client.get,
+                              f'/questions/tag/{self.tag.id}')
+
+    def test_fuzzy_search(self):
+        '''
+        Nothing is found by full-text search, titles with typos are
+        found through the trigram index
+        '''
+        result_cache.clear()
+        self.assertNoSeqScans(self.client.get, '/questions/search',
+                              {'search': 'Qeustion 42'})
+
+    def test_show_question(self):
+        response = self.client.get(f'/questions/{self.q.id}')
+        next_cursor = response.context['page_obj'].next_cursor
+        for params in ({}, {'cursor': next_cursor}):
+            self.assertNoSeqScans(self.client.get, f'/questions/{self.q.id}',
+                                  params)
+        self.assertNoSeqScans(self.client.get,
+                              f'/questions/{self.q.id}/answers',
+                              {'cursor': next_cursor})
+
+    def test_votes(self):
+        self.client.force_login(self.bob)
+        answer = self.q.answer_set.first()
+        referer = f'/questions/{self.q.id}'
+        for url in (f'/questions/questionvote/{self.q.id}/1',
+                    f'/questions/answervote/{answer.id}/0'):
+            with self.subTest(url=url):
+                self.assertNoSeqScans(self.client.get, url,
+                                      HTTP_REFERER=referer)
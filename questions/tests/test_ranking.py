@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from questions.models import Answer, Question, Vote
+from questions.ranking import hot_score, recompute_hot_scores
+
+
+class TestHotScore(TestCase):
+
+    def setUp(self):
+        self.now = datetime(2022, 3, 1, tzinfo=timezone.utc)
+
+    def test_score_decays_with_age(self):
+        scores = [
+            hot_score(10, 2, self.now - timedelta(hours=hours), self.now)
+            for hours in (0, 1, 5, 24, 24 * 30)
+        ]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertGreater(scores[-1], 0)
+
+    def test_score_grows_with_votes_and_answers(self):
+        created_on = self.now - timedelta(hours=3)
+        self.assertLess(hot_score(1, 0, created_on, self.now),
+                        hot_score(2, 0, created_on, self.now))
+        self.assertLess(hot_score(1, 0, created_on, self.now),
+                        hot_score(1, 1, created_on, self.now))
+
+    def test_downvoted_questions_do_not_rise(self):
+        scores = [
+            hot_score(-10, 0, self.now - timedelta(hours=hours), self.now)
+            for hours in (0, 24, 24 * 30)
+        ]
+        self.assertEqual(scores, [0, 0, 0])
+        self.assertLess(
+            scores[-1],
+            hot_score(1, 0, self.now - timedelta(hours=5), self.now))
+
+    def test_new_question_beats_ancient_one(self):
+        ancient = hot_score(1000, 10, self.now - timedelta(days=365),
+                            self.now)
+        fresh = hot_score(5, 1, self.now - timedelta(hours=1), self.now)
+        self.assertGreater(fresh, ancient)
+
+
+class TestRecomputeHotScores(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.sam.save()
+        cls.alice = User.objects.create_user(
+            username='Alice',
+            email='alice@wonderland.com',
+            password='alicepass'
+        )
+        cls.alice.save()
+        Question.objects.bulk_create([
+            Question(title=f'Question {i}', author=cls.sam,
+                     content='Lorem ipsum', votes=i)
+            for i in range(30)
+        ])
+
+    def test_first_run_scores_everything(self):
+        self.assertEqual(recompute_hot_scores(), 30)
+        self.assertFalse(
+            Question.objects.filter(scored_on__isnull=True).exists())
+        top = Question.objects.order_by('-hot_score').first()
+        self.assertEqual(top.votes, 29)
+
+    def test_only_touched_and_top_are_rescored(self):
+        recompute_hot_scores()
+        # nothing touched: only the top window is re-decayed
+        self.assertEqual(recompute_hot_scores(window=5), 5)
+
+        qw = Question.objects.get(title='Question 0')
+        Vote.register_vote(qw, self.alice.id, vote=1)
+        Answer(author=self.alice, question=Question.objects.get(
+            title='Question 1'), content='Lorem').save()
+        self.assertEqual(recompute_hot_scores(window=5), 7)
+        qw.refresh_from_db()
+        self.assertGreater(qw.hot_score, 0)
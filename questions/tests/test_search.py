@@ -0,0 +1,633 @@
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from questions.caching import bump_version
+from questions.models import Answer, Question, Tag
+from questions.search import (CONTENT_VERSION, get_backend, normalize_query,
+                              parse_search, result_cache, search_question_ids)
+from questions.search.cache import ResultCache
+from questions.search.fuzzy import TrigramIndex, title_index, trigrams
+from questions.search.suggest import PrefixIndex, prefix_keys
+from questions.search import tag_suggest
+from questions.search.tag_suggest import TagModel, build_tag_model
+from questions.search.tags import (intersect, parse_tag_query, subtract,
+                                   tag_query_ids)
+from questions.search.memory import InvertedIndex
+from questions.search.snapshot import (SnapshotError, read_snapshot,
+                                       write_snapshot)
+
+
+class TestParseSearch(TestCase):
+
+    def test_words_phrases_and_prefixes(self):
+        self.assertEqual(
+            parse_search('django "class based views" serial*'),
+            [('word', 'django'), ('phrase', 'class based views'),
+             ('prefix', 'serial')]
+        )
+
+    def test_garbage_is_ignored(self):
+        self.assertEqual(parse_search('& | ! :* ""'), [])
+        self.assertEqual(parse_search("o'reilly"),
+                         [('word', 'o'), ('word', 'reilly')])
+
+
+class TestNormalizeQuery(TestCase):
+
+    def test_normalize(self):
+        self.assertEqual(normalize_query('  Django\t  ORM\n'), 'django orm')
+        self.assertEqual(normalize_query('"Based  Views"'), '"based views"')
+        self.assertEqual(normalize_query('TAG: Python  -tag:  Flask'),
+                         'tag:python -tag:flask')
+        self.assertEqual(normalize_query('hashtag: x'), 'hashtag: x')
+
+
+@override_settings(SEARCH_CACHE_SIZE=2, SEARCH_CACHE_TTL=60)
+class TestResultCache(TestCase):
+
+    def setUp(self):
+        self.cache = ResultCache()
+
+    def test_lru_eviction(self):
+        self.cache.set('a', 1, [1, 2])
+        self.cache.set('b', 1, [3])
+        self.assertEqual(list(self.cache.get('a', 1)), [1, 2])
+        self.cache.set('c', 1, [])
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get('b', 1))     # least recently used
+        self.assertEqual(list(self.cache.get('a', 1)), [1, 2])
+        self.assertEqual(list(self.cache.get('c', 1)), [])
+
+    def test_generation_and_ttl(self):
+        self.cache.set('a', 1, [1])
+        self.assertIsNone(self.cache.get('a', 2))
+        self.assertIsNone(self.cache.get('a', 1))     # dropped
+        self.cache.set('a', 2, [1])
+        with mock.patch('questions.search.cache.time.monotonic',
+                        return_value=10 ** 9):
+            self.assertIsNone(self.cache.get('a', 2))
+
+
+class TestTrigramIndex(TestCase):
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams('Orm!'), {'  o', ' or', 'orm', 'rm '})
+        self.assertEqual(trigrams('...'), set())
+
+    def test_similarity_ranking(self):
+        index = TrigramIndex()
+        index.add(1, 'Django ORM annotations')
+        index.add(2, 'Django admin')
+        index.add(3, 'Flask')
+        self.assertEqual(index.search('djnago orm', 10, 0.6), [1])
+        self.assertEqual(index.search('djnago', 10, 0.4), [2, 1])
+        self.assertEqual(index.search('djnago', 1, 0.4), [2])
+        self.assertEqual(index.search('flsk', 10, 0.7), [])
+        index.add(3, 'Flask ORM')
+        index.remove(1)
+        self.assertEqual(index.search('djnago orm', 10, 0.6), [])
+        self.assertEqual(index.search('orm', 10, 0.6), [3])
+        self.assertEqual(index.search('flask', 10, 0.6), [3])
+
+
+class TestPrefixIndex(TestCase):
+
+    def setUp(self):
+        self.index = PrefixIndex()
+        self.index.extend('question', [
+            (1, 'Django ORM annotations', 5),
+            (2, 'Class based views in Django', 7),
+            (3, 'Ordering of   querysets', 0),
+        ])
+        self.index.extend('tag', [(1, 'django', 10), (2, 'docker', 1)])
+
+    def test_prefix_keys(self):
+        self.assertEqual(prefix_keys(' Django  ORM '), {'django orm', 'orm'})
+
+    def test_lookup(self):
+        '''
+        Titles are found by the start of any word, heaviest first
+        '''
+        self.assertEqual(self.index.lookup('DJA', 10), {
+            'question': [(2, 'Class based views in Django'),
+                         (1, 'Django ORM annotations')],
+            'tag': [(1, 'django')],
+        })
+        self.assertEqual(self.index.lookup('or', 10), {
+            'question': [(1, 'Django ORM annotations'),
+                         (3, 'Ordering of   querysets')],
+        })
+        self.assertEqual(self.index.lookup('ordering of q', 10), {
+            'question': [(3, 'Ordering of   querysets')],
+        })
+        self.assertEqual(self.index.lookup('d', 1)['tag'], [(1, 'django')])
+        self.assertEqual(self.index.lookup('flask', 10), {})
+        self.assertEqual(self.index.lookup('  ', 10), {})
+
+    def test_heaviest_past_scan_limit(self):
+        '''
+        Prefixes with more entries than MAX_SCAN still give the top
+        items by weight
+        '''
+        self.index.extend('question', [
+            (10 + i, f'Django question {i}', i) for i in range(20)
+        ])
+        expected = self.index.lookup('dj', 3)
+        self.assertEqual(expected['question'], [
+            (29, 'Django question 19'), (28, 'Django question 18'),
+            (27, 'Django question 17')])
+        with mock.patch('questions.search.suggest.MAX_SCAN', 2):
+            self.assertEqual(self.index.lookup('dj', 3), expected)
+            self.assertEqual(self.index.lookup('d', 1)['tag'],
+                             [(1, 'django')])
+
+    def test_many_light_matches(self):
+        '''
+        A prefix of many light items among heavy ones is scanned once,
+        then served from its bucket kept up to date by add and remove
+        '''
+        self.index.extend('question', [
+            (100 + i, f'Heavy question {i}', 1000 + i) for i in range(50)
+        ] + [
+            (200 + i, f'Zq light question {i}', i % 3) for i in range(30)
+        ])
+        expected = [(229, 'Zq light question 29'),
+                    (226, 'Zq light question 26')]
+        with mock.patch('questions.search.suggest.MAX_SCAN', 5), \
+                mock.patch('questions.search.suggest.BUCKET_SIZE', 4), \
+                mock.patch.object(PrefixIndex, '_scan',
+                                  wraps=self.index._scan) as scan:
+            self.index.prime()
+            scan.reset_mock()
+            self.assertEqual(self.index.lookup('zq', 2)['question'], expected)
+            self.assertEqual(self.index.lookup('zq', 4)['question'][:2],
+                             expected)
+            scan.assert_not_called()
+
+            self.index.add('question', 300, 'Zq heavy question', 99)
+            self.assertEqual(self.index.lookup('zq', 2)['question'],
+                             [(300, 'Zq heavy question'), expected[0]])
+            scan.assert_not_called()
+
+            self.index.remove('question', 300)
+            self.index.remove('question', 229)
+            self.assertEqual(self.index.lookup('zq', 2)['question'], [
+                (226, 'Zq light question 26'), (223, 'Zq light question 23')])
+            scan.assert_called_once()
+
+    def test_updates(self):
+        self.index.add('question', 3, 'Docker compose', 1)
+        self.index.remove('tag', 1)
+        self.assertEqual(self.index.lookup('do', 10), {
+            'question': [(3, 'Docker compose')],
+            'tag': [(2, 'docker')],
+        })
+        self.assertEqual(self.index.lookup('ordering', 10), {})
+
+
+class TestTagQuery(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.q1, cls.q2, cls.q3 = Question.objects.bulk_create([
+            Question(title=f'Question {i}', author=cls.sam,
+                     content='Lorem ipsum dolor est')
+            for i in range(3)
+        ])
+        cls.python = Tag.objects.create(title='Python')
+        cls.django = Tag.objects.create(title='django')
+        cls.flask = Tag.objects.create(title='flask')
+        cls.python.questions.add(cls.q1, cls.q2, cls.q3)
+        cls.django.questions.add(cls.q1, cls.q2)
+        cls.flask.questions.add(cls.q2)
+
+    def setUp(self):
+        cache.clear()
+        result_cache.clear()
+
+    def ids(self, include, exclude=()):
+        return list(tag_query_ids(include, exclude))
+
+    def test_parse_tag_query(self):
+        self.assertEqual(
+            parse_tag_query('tag:python orm -tag:flask tag:django'),
+            (['python', 'django'], ['flask'], 'orm'))
+        self.assertEqual(parse_tag_query('django orm'), ([], [], 'django orm'))
+
+    def test_set_operations(self):
+        self.assertEqual(list(intersect([1, 3, 5, 7], [3, 4, 5], [5, 9])),
+                         [5])
+        self.assertEqual(list(subtract([1, 3, 5, 7], [3], [7, 8])), [1, 5])
+
+    def test_tag_query(self):
+        self.assertEqual(self.ids(['python', 'django']),
+                         [self.q1.id, self.q2.id])
+        self.assertEqual(self.ids(['python'], ['flask']),
+                         [self.q1.id, self.q3.id])
+        self.assertEqual(self.ids(['python', 'django'], ['flask', 'nope']),
+                         [self.q1.id])
+        self.assertEqual(self.ids(['python', 'nope']), [])
+        self.assertEqual(self.ids([], ['flask']), [])
+
+    def test_postings_follow_tagging(self):
+        '''
+        Cached results and posting lists are invalidated both when
+        questions are tagged and when tags are removed
+        '''
+        self.assertEqual(self.ids(['django'], ['flask']), [self.q1.id])
+        with self.assertNumQueries(0):
+            self.ids(['django'], ['flask'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.q3.tag_set.add(self.django)
+        self.assertEqual(self.ids(['django'], ['flask']),
+                         [self.q1.id, self.q3.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flask.questions.clear()
+        self.assertEqual(self.ids(['django'], ['flask']),
+                         [self.q1.id, self.q2.id, self.q3.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.q1.tag_set.clear()
+            self.q2.delete()
+        self.assertEqual(self.ids(['django']), [self.q3.id])
+
+
+class TestSearchQuestions(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.sam.save()
+        cls.orm = Question(
+            title='Django ORM annotations',
+            author=cls.sam,
+            content='How to count related objects without N+1 queries?'
+        )
+        cls.orm.save()
+        cls.views = Question(
+            title='Class based views',
+            author=cls.sam,
+            content='When should I prefer function views in Django?'
+        )
+        cls.views.save()
+        cls.other = Question(
+            title='Serialization of dates',
+            author=cls.sam,
+            content='JSON does not know about datetime'
+        )
+        cls.other.save()
+        Answer(author=cls.sam, question=cls.other,
+               content='Use DjangoJSONEncoder for that').save()
+
+    def setUp(self):
+        result_cache.clear()
+        title_index.clear()
+
+    def search(self, phrase):
+        return list(search_question_ids(phrase))
+
+    def test_typos_in_titles(self):
+        '''
+        Titles similar to the phrase are found if nothing matches exactly
+        '''
+        self.assertEqual(self.search('djnago orm'), [self.orm.id])
+        self.assertEqual(self.search('"clas basde views"'), [self.views.id])
+        self.assertEqual(self.search('xyzzy'), [])
+
+    def test_search_in_questions_and_answers(self):
+        self.assertEqual(self.search('related objects'), [self.orm.id])
+        self.assertEqual(self.search('DjangoJSONEncoder'), [self.other.id])
+        self.assertEqual(self.search('abrakadabra'), [])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql',
+                         'full-text search works on PostgreSQL only')
+    def test_title_ranks_higher_than_content(self):
+        self.assertEqual(self.search('views'),
+                         [self.views.id])
+        self.assertEqual(self.search('django'),
+                         [self.orm.id, self.views.id])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql',
+                         'full-text search works on PostgreSQL only')
+    def test_phrases_and_prefixes(self):
+        self.assertEqual(self.search('"based views"'), [self.views.id])
+        # words out of order are no match for full-text search...
+        self.assertEqual(get_backend().search('"views based"', 10), [])
+        # ...but the title is still found by the fuzzy fallback
+        self.assertEqual(self.search('"views based"'), [self.views.id])
+        self.assertEqual(self.search('serial*'), [self.other.id])
+        self.assertEqual(self.search('annot* django'), [self.orm.id])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql',
+                         'full-text search works on PostgreSQL only')
+    def test_document_follows_answers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            answer = Answer(author=self.sam, question=self.orm,
+                            content='Subquery with OuterRef works fine')
+            answer.save()
+        self.assertEqual(self.search('OuterRef'), [self.orm.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            answer.delete()
+        self.assertEqual(self.search('OuterRef'), [])
+
+    def test_flags_keep_the_document(self):
+        '''
+        Marking the best answer changes neither the search document nor
+        the cached results
+        '''
+        answer = Answer.objects.get(question=self.other)
+        self.assertEqual(self.search('DjangoJSONEncoder'), [self.other.id])
+        with mock.patch('questions.signals.get_backend') as backend, \
+                self.captureOnCommitCallbacks(execute=True):
+            answer.set_new_flag()
+            answer.delete_flag()
+        backend.assert_not_called()
+        with self.assertNumQueries(0):
+            self.search('DjangoJSONEncoder')
+
+    def test_results_are_cached_until_write(self):
+        '''
+        Same search is not recomputed until questions or answers change
+        '''
+        self.assertEqual(self.search('DjangoJSONEncoder'), [self.other.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('  djangojsonencoder '),
+                             [self.other.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            Answer(author=self.sam, question=self.orm,
+                   content='DjangoJSONEncoder is not enough').save()
+        self.assertEqual(sorted(self.search('DjangoJSONEncoder')),
+                         [self.orm.id, self.other.id])
+
+
+class TestSnapshot(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        write_snapshot(self.path, {'name': 'test'}, {
+            'ids': array('q', [1, 5, 2 ** 40]),
+            'freqs': array('I', [3]),
+            'empty': array('q'),
+        })
+        header, sections = read_snapshot(self.path)
+        self.assertEqual(header['name'], 'test')
+        self.assertEqual(list(sections['ids']), [1, 5, 2 ** 40])
+        self.assertEqual(list(sections['freqs']), [3])
+        self.assertEqual(list(sections['empty']), [])
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'garbage')
+        with self.assertRaises(SnapshotError):
+            read_snapshot(self.path)
+
+
+class TestInvertedIndex(TestCase):
+
+    def setUp(self):
+        self.index = InvertedIndex()
+        self.index.add_document(1, 'Django ORM annotations',
+                                'How to count related objects?')
+        self.index.add_document(2, 'Class based views',
+                                'Function views or class views in Django?')
+        self.index.add_document(3, 'Serialization of dates',
+                                'Use DjangoJSONEncoder')
+
+    def test_bm25_ranking(self):
+        '''
+        All terms are required, more frequent terms rank higher
+        '''
+        self.assertEqual(self.index.search('views', 10), [2])
+        self.assertEqual(self.index.search('django', 10), [1, 2])
+        self.assertEqual(self.index.search('django views', 10), [2])
+        self.assertEqual(self.index.search('"based views"', 10), [2])
+        self.assertEqual(self.index.search('serial* dates', 10), [3])
+        self.assertEqual(self.index.search('abrakadabra', 10), [])
+        self.assertEqual(self.index.search('the', 10), [])
+        self.assertEqual(self.index.search('django', 1), [1])
+
+    def test_updates(self):
+        self.index.add_document(1, 'Django ORM', 'Subquery and OuterRef')
+        self.assertEqual(self.index.search('outerref', 10), [1])
+        self.assertEqual(self.index.search('annotations', 10), [])
+        self.index.remove_document(2)
+        self.assertEqual(self.index.search('django', 10), [1])
+        self.assertEqual(self.index.document_ids(), {1, 3})
+        self.assertEqual(self.index.doc_count, 2)
+
+    def test_snapshot(self):
+        '''
+        Snapshot keeps the merged segments, loaded index is updatable
+        '''
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'index.bin')
+        self.index.remove_document(3)
+        self.index.save(path)
+        loaded = InvertedIndex.load(path)
+        self.assertEqual(loaded.document_ids(), {1, 2})
+        self.assertEqual(loaded.total_length, self.index.total_length)
+        for phrase in ('django', 'views', 'annot*', 'django views'):
+            self.assertEqual(loaded.search(phrase, 10),
+                             self.index.search(phrase, 10))
+        loaded.add_document(2, 'Generic views', 'ListView and DetailView')
+        loaded.add_document(4, 'Django admin', 'Custom actions')
+        self.assertEqual(loaded.search('django', 10), [4, 1])
+        self.assertEqual(loaded.search('listview', 10), [2])
+        self.assertEqual(loaded.document_ids(), {1, 2, 4})
+
+
+class TestMemoryBackend(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            SEARCH_BACKEND='questions.search.memory.MemoryBackend',
+            SEARCH_INDEX_PATH=os.path.join(cls.directory, 'index.bin')
+        )
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.directory)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.orm = Question(
+            title='Django ORM annotations',
+            author=cls.sam,
+            content='How to count related objects?'
+        )
+        cls.orm.save()
+        cls.views = Question(
+            title='Class based views',
+            author=cls.sam,
+            content='When should I prefer function views in Django?'
+        )
+        cls.views.save()
+
+    def search(self, phrase):
+        return list(search_question_ids(phrase))
+
+    def setUp(self):
+        # every test starts with a fresh backend
+        get_backend.cache_clear()
+        result_cache.clear()
+        title_index.clear()
+
+    def test_index_follows_signals(self):
+        '''
+        Committed questions and answers are indexed, deleted are not
+        '''
+        self.assertEqual(self.search('django'),
+                         [self.orm.id, self.views.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            answer = Answer(author=self.sam, question=self.orm,
+                            content='Subquery with OuterRef works fine')
+            answer.save()
+        self.assertEqual(self.search('OuterRef'), [self.orm.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            answer.delete()
+        self.assertEqual(self.search('OuterRef'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.views.delete()
+        self.assertEqual(self.search('django'), [self.orm.id])
+
+    def test_snapshot_catch_up(self):
+        '''
+        Index loaded from a snapshot picks up later changes
+        '''
+        get_backend().rebuild()
+        get_backend.cache_clear()
+        new = Question(title='Django signals', author=self.sam,
+                       content='Where to connect receivers?')
+        new.save()
+        self.views.delete()
+        self.assertEqual(self.search('django'),
+                         [new.id, self.orm.id])
+
+    def test_sync_with_other_processes(self):
+        '''
+        Questions written by other processes are picked up once
+        the content version changes
+        '''
+        self.assertEqual(self.search('signals'), [])
+        # no signals, as if the question was saved by another worker
+        new, = Question.objects.bulk_create([
+            Question(title='Django signals', author=self.sam,
+                     content='Where to connect receivers?')
+        ])
+        bump_version(CONTENT_VERSION)
+        self.assertEqual(self.search('signals'), [new.id])
+
+
+class TestTagModel(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        tagged = {
+            'Django ORM annotations': ['python', 'django', 'orm'],
+            'Django ORM subqueries': ['python', 'django', 'orm'],
+            'Django views': ['python', 'django'],
+            'Flask blueprints': ['python', 'flask'],
+            'Flask views': ['python', 'flask'],
+            'Docker compose': ['docker'],
+        }
+        tags = {}
+        for title, names in tagged.items():
+            qw = Question.objects.create(title=title, author=cls.sam,
+                                         content='Lorem ipsum')
+            for name in names:
+                if name not in tags:
+                    tags[name] = Tag.objects.create(title=name)
+                tags[name].questions.add(qw)
+        Question.objects.create(title='Untagged', author=cls.sam,
+                                content='Lorem ipsum')
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'tags.bin')
+        self.assertEqual(build_tag_model(self.path), 6)
+        self.model = TagModel(self.path)
+
+    def test_suggest_by_tags(self):
+        self.assertEqual(self.model.suggest(['Django'], '', 5),
+                         ['python', 'orm'])
+        self.assertEqual(self.model.suggest(['python'], '', 1), ['django'])
+        self.assertEqual(self.model.suggest(['python', 'django', 'orm'],
+                                            '', 5), ['flask'])
+        self.assertEqual(self.model.suggest(['nope'], '', 5), [])
+
+    def test_suggest_by_title(self):
+        '''
+        Title terms seen with at least two tagged questions count
+        '''
+        self.assertEqual(
+            sorted(self.model.suggest([], 'Blueprints in Flask', 5)),
+            ['flask', 'python'])
+        self.assertEqual(self.model.suggest([], 'Django views', 5),
+                         ['python', 'django', 'orm', 'flask'])
+        self.assertEqual(self.model.suggest([], 'Docker', 5), [])
+
+    def test_tag_deleted_during_build(self):
+        tagged_questions = tag_suggest._tagged_questions
+
+        def deleting_orm():
+            yield from tagged_questions()
+            Tag.objects.filter(title='orm').delete()
+
+        with mock.patch.object(tag_suggest, '_tagged_questions',
+                               deleting_orm):
+            build_tag_model(self.path)
+        model = TagModel(self.path)
+        self.assertEqual(model.suggest(['Django'], '', 5), ['python'])
+        self.assertEqual(model.suggest([], 'Django views', 5),
+                         ['python', 'django', 'flask'])
+
+    def test_endpoint(self):
+        with override_settings(TAG_MODEL_PATH=self.path):
+            response = self.client.get('/questions/suggest/tags', {
+                'title': 'Flask views', 'tags': 'flask'})
+            self.assertEqual(response.json(), {'tags': ['python', 'django']})
+        with override_settings(TAG_MODEL_PATH=self.path + '.missing'):
+            response = self.client.get('/questions/suggest/tags',
+                                       {'tags': 'flask'})
+            self.assertEqual(response.json(), {'tags': []})
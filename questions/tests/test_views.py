@@ -1,14 +1,23 @@
+import html
+import re
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.contrib import auth
 
-from questions.models import Question, Tag, Answer
+from questions.models import Question, Tag, Answer, Vote
+from questions.search.suggest import suggestions
 
 
 class TestIndex(TestCase):
 
+    def setUp(self):
+        cache.clear()
+
     def test_index_page_basic_rendering(self):
         response = self.client.get('')
         self.assertEqual(response.status_code, 200)
@@ -22,6 +31,117 @@ class TestIndex(TestCase):
         self.assertTemplateUsed(response, 'questions/hot_questions.html')
         mock.assert_called_once()
 
+    def test_index_cursor_pagination(self):
+        '''
+        Index pages are linked with cursors instead of page numbers
+        '''
+        sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        Question.objects.bulk_create([
+            Question(title=f'Question {i}', author=sam, content='Lorem')
+            for i in range(25)
+        ])
+        for url in ('/questions/', '/questions/hot'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), 20)
+                self.assertFalse(page_obj.has_previous())
+                self.assertContains(
+                    response, f'?cursor={page_obj.next_cursor}')
+
+                response = self.client.get(
+                    url, {'cursor': page_obj.next_cursor})
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), 5)
+                self.assertEqual(page_obj.number, 2)
+                self.assertFalse(page_obj.has_next())
+                self.assertContains(
+                    response, f'?cursor={page_obj.previous_cursor}')
+
+
+class TestListingQueries(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.sam.save()
+        cls.tag = Tag(title='Python')
+        cls.tag.save()
+        cls.tag2 = Tag(title='Lorem')
+        cls.tag2.save()
+        for i in range(20):
+            qw = Question(title=f'Question {i}', author=cls.sam,
+                          content='Lorem ipsum')
+            qw.save()
+            cls.tag.questions.add(qw)
+            cls.tag2.questions.add(qw)
+            for j in range(i % 3):
+                Answer(author=cls.sam, question=qw,
+                       content=f'Answer {j}').save()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_listing_annotations(self):
+        qw = Question.objects.listing().get(title='Question 5')
+        with self.assertNumQueries(0):
+            self.assertEqual(qw.number_answers, 2)
+            self.assertEqual(len(qw.tags), 2)
+            self.assertEqual(qw.author.username, 'Sam')
+
+    def test_listing_pages_query_budget(self):
+        '''
+        Page with 20 question cards: questions and tags (plus the tag
+        itself and total count for the tag page). Trending sidebar
+        comes from cache.
+        '''
+        Question.cached_trending()     # warm up trending cache
+        # the tag page counts its questions, on PostgreSQL the planner
+        # estimate is read first
+        count = 2 if connection.vendor == 'postgresql' else 1
+        budgets = {
+            '/questions/': 2,
+            '/questions/hot': 2,
+            f'/questions/tag/{self.tag.id}': 3 + count,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url)
+                self.assertEqual(len(response.context['page_obj']), 20)
+                self.assertContains(response, 'Lorem', count=20)
+
+    def test_question_page_query_budget(self):
+        '''
+        Question page costs the same number of queries whatever the
+        number of answers and their authors: question with author and
+        profile, tags, answers with authors and profiles. A member also
+        pays for the session, the user and his profile and his votes.
+        '''
+        qw = Question.objects.get(title='Question 0')
+        url = f'/questions/{qw.id}'
+        Question.cached_trending()     # warm up trending cache
+        for i in range(10):
+            author = User.objects.create_user(username=f'User {i}',
+                                              password='userpass')
+            Answer(author=author, question=qw, content=f'Reply {i}').save()
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertContains(response, 'Reply', count=10)
+        self.assertContains(response, 'Python')
+
+        self.client.force_login(self.sam)
+        with self.assertNumQueries(7):
+            self.client.get(url)
+
 
 class TestSearch(TestCase):
 
@@ -58,6 +178,9 @@ class TestSearch(TestCase):
         )
         cls.a.save()
 
+    def setUp(self):
+        cache.clear()
+
     def test_search_tag(self):
         '''
         Show all questions with given tag
@@ -91,6 +214,41 @@ class TestSearch(TestCase):
         # 'ipsum dolor' search phrase in one of the answers:
         self.assertContains(response, 'How to Lorem?')
 
+    def test_index_search_get(self):
+        '''
+        Search phrase can be passed in the query string, so that
+        page links keep it
+        '''
+        response = self.client.get('/questions/search',
+                                   {'search': 'Ipsum   DOLOR', 'page': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'How to Django?')
+        self.assertContains(response, 'How to Lorem?')
+        self.assertEqual(response.context['page_query'],
+                         'search=Ipsum+++DOLOR&')
+
+    def test_multi_tag_search(self):
+        '''
+        Combine tags, exclusions and words in one search
+        '''
+        for search, titles in (
+                ('tag:python tag:lorem', ['How to Lorem?']),
+                ('tag:python -tag:LOREM', ['How to Django?']),
+                ('tag:python ipsum', ['How to Lorem?', 'How to Django?']),
+                ('tag:python -tag:lorem django', ['How to Django?']),
+                ('tag:python tag:nope', [])):
+            with self.subTest(search=search):
+                response = self.client.get('/questions/search',
+                                           {'search': search})
+                self.assertEqual(response.status_code, 200)
+                self.assertTemplateUsed(response, 'questions/search.html')
+                self.assertEqual(
+                    sorted(qw.title for qw in response.context['page_obj']),
+                    sorted(titles))
+        response = self.client.get('/questions/search',
+                                   {'search': '-tag:python'})
+        self.assertContains(response, 'Which tags to search for?')
+
     def test_index_search_nothing_found(self):
         '''
         Check empty search result
@@ -121,6 +279,141 @@ class TestSearch(TestCase):
         self.assertContains(response, 'How to Lorem?')
         self.assertContains(response, 'How to Django?')
 
+    def test_tag_search_pages_keep_phrase(self):
+        '''
+        Next link of a "tag:" search leads to the next page of the tag
+        '''
+        Question.objects.bulk_create([
+            Question(title=f'Tagged {i:02}', author=self.sam,
+                     content='Lorem') for i in range(25)
+        ])
+        self.tag2.questions.add(*Question.objects.filter(
+            title__startswith='Tagged'))
+        response = self.client.get('/questions/search',
+                                   {'search': 'tag:lorem'})
+        self.assertEqual(len(response.context['page_obj']), 20)
+        first = {qw.id for qw in response.context['page_obj']}
+        next_link = html.unescape(re.search(
+            r'href="([^"]*)">Next<', response.content.decode()).group(1))
+        self.assertEqual(next_link, '?search=tag%3Alorem&page=2')
+        response = self.client.get('/questions/search' + next_link)
+        self.assertTemplateUsed(response, 'questions/tag.html')
+        second = {qw.id for qw in response.context['page_obj']}
+        self.assertEqual(len(second), 6)
+        self.assertFalse(first & second)
+        self.assertEqual(first | second, set(
+            self.tag2.questions.values_list('id', flat=True)))
+
+
+class TestSuggest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.q = Question(title='How to Django?', author=cls.sam,
+                         content='Lorem ipsum dolor est')
+        cls.q.save()
+        cls.tag = Tag(title='django')
+        cls.tag.save()
+        cls.tag.questions.add(cls.q)
+
+    def setUp(self):
+        suggestions.clear()
+
+    def test_suggest(self):
+        '''
+        Question and tag titles for a prefix as JSON
+        '''
+        response = self.client.get('/questions/suggest', {'q': 'djan'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'questions': [{'id': self.q.id, 'title': 'How to Django?',
+                           'url': f'/questions/{self.q.id}'}],
+            'tags': [{'id': self.tag.id, 'title': 'django',
+                      'url': f'/questions/tag/{self.tag.id}'}],
+        })
+        response = self.client.get('/questions/suggest', {'q': 'flask'})
+        self.assertEqual(response.json(), {'questions': [], 'tags': []})
+
+    def test_index_is_warmed(self):
+        suggestions.warm()
+        with self.assertNumQueries(0):
+            data = self.client.get('/questions/suggest', {'q': 'dja'}).json()
+        self.assertEqual(data['tags'][0]['title'], 'django')
+
+    def test_suggestions_follow_writes(self):
+        '''
+        New questions and tags are suggested, deleted are not
+        '''
+        self.client.get('/questions/suggest', {'q': 'dja'})
+        with self.captureOnCommitCallbacks(execute=True):
+            qw = Question(title='Django admin', author=self.sam,
+                          content='Custom actions')
+            qw.save()
+            tag = Tag(title='djangoadmin')
+            tag.save()
+            tag.questions.add(qw)
+        data = self.client.get('/questions/suggest', {'q': 'dja'}).json()
+        self.assertEqual([item['title'] for item in data['questions']],
+                         ['Django admin', 'How to Django?'])
+        with self.assertNumQueries(0):
+            self.client.get('/questions/suggest', {'q': 'ho'})
+        self.assertEqual([item['title'] for item in data['tags']],
+                         ['djangoadmin', 'django'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.q.delete()
+        data = self.client.get('/questions/suggest', {'q': 'dja'}).json()
+        self.assertEqual([item['title'] for item in data['questions']],
+                         ['Django admin'])
+
+
+class TestTagDirectory(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        questions = Question.objects.bulk_create([
+            Question(title=f'Question {i}', author=cls.sam,
+                     content='Lorem ipsum dolor est')
+            for i in range(3)
+        ])
+        for i, title in enumerate(('python', 'django', 'flask')):
+            tag = Tag.objects.create(title=title)
+            tag.questions.add(*questions[:3 - i])
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, response):
+        return [tag.title for tag in response.context['page_obj']]
+
+    def test_sorting(self):
+        response = self.client.get('/questions/tags')
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'questions/tags.html')
+        self.assertContains(response, '3 question(s)')
+        self.assertEqual(self.titles(response), ['python', 'django', 'flask'])
+        response = self.client.get('/questions/tags', {'sort': 'name'})
+        self.assertEqual(self.titles(response), ['django', 'flask', 'python'])
+        response = self.client.get('/questions/tags', {'sort': 'recent'})
+        self.assertEqual(self.titles(response), ['flask', 'django', 'python'])
+        response = self.client.get('/questions/tags', {'sort': 'nope'})
+        self.assertEqual(response.context['sort'], 'popular')
+
+    def test_single_query(self):
+        self.client.get('/questions/tags')   # warm up trending cache
+        with self.assertNumQueries(1):
+            response = self.client.get('/questions/tags', {'sort': 'recent'})
+        self.assertEqual(len(response.context['page_obj']), 3)
+
 
 class TestQuestionViews(TestCase):
 
@@ -139,6 +432,9 @@ class TestQuestionViews(TestCase):
         )
         cls.q.save()
 
+    def setUp(self):
+        cache.clear()
+
     def test_basic_show_question(self):
         response = self.client.get(f'/questions/{self.q.id}')
         self.assertEqual(response.status_code, 200)
@@ -163,6 +459,27 @@ class TestQuestionViews(TestCase):
         for content in contents:
             self.assertContains(response, content)
 
+    def test_viewer_votes_in_context(self):
+        '''
+        Votes of the viewer for the question and the answers are looked
+        up at once and the voted arrows are highlighted
+        '''
+        bob = User.objects.create_user(username='Bob', password='bobpass')
+        answers = [
+            Answer.objects.create(author=self.sam, question=self.q,
+                                  content=f'Answer {i}')
+            for i in range(3)
+        ]
+        Vote.register_vote(self.q, bob.id, vote=0)
+        Vote.register_vote(answers[1], bob.id, vote=1)
+        self.client.force_login(bob)
+        response = self.client.get(f'/questions/{self.q.id}')
+        self.assertEqual(response.context['question_vote'], -1)
+        self.assertEqual(response.context['answer_votes'],
+                         {answers[1].id: 1})
+        self.assertContains(response, 'class="rounded bg-danger"', count=1)
+        self.assertContains(response, 'class="rounded bg-success"', count=1)
+
     def test_make_answer_form_not_show(self):
         '''
         User who not logged in cannot see answer form
@@ -220,6 +537,221 @@ class TestQuestionViews(TestCase):
         )
 
 
+@override_settings(ANSWERS_PER_PAGE=3)
+class TestAnswerPages(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.alice = User.objects.create_user(
+            username='Alice',
+            email='alice@wonderland.com',
+            password='alicepass'
+        )
+        cls.q = Question.objects.create(
+            title='How to Django?', author=cls.sam,
+            content='Lorem ipsum dolor est')
+        cls.answers = [
+            Answer.objects.create(author=cls.alice, question=cls.q,
+                                  content=f'Answer {i}', votes=i % 3)
+            for i in range(8)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def expected_order(self):
+        return sorted(self.answers, key=lambda answer: (
+            -answer.votes, -answer.created_on.timestamp(), -answer.id))
+
+    def walk(self):
+        '''
+        Go through all the pages with the cursor links, return ids of
+        the answers on every page
+        '''
+        pages = []
+        cursor = None
+        while True:
+            response = self.client.get(f'/questions/{self.q.id}',
+                                       {'cursor': cursor} if cursor else {})
+            pages.append([a.id for a in response.context['answer_query']])
+            cursor = response.context['page_obj'].next_cursor
+            if cursor is None:
+                return pages
+
+    def test_pages_are_bounded(self):
+        pages = self.walk()
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertEqual(sum(pages, []),
+                         [a.id for a in self.expected_order()])
+
+    def test_accepted_answer_pinned_first(self):
+        accepted = self.expected_order()[-1]    # the worst one
+        accepted.set_new_flag()
+        pages = self.walk()
+        self.assertEqual(pages[0][0], accepted.id)
+        self.assertEqual(len(pages[0]), 4)
+        # shown once
+        self.assertEqual(sum(pages, []).count(accepted.id), 1)
+        self.assertEqual(len(sum(pages, [])), 8)
+
+    def test_answers_endpoint(self):
+        '''
+        Further answers come as an HTML fragment with the next cursor
+        '''
+        response = self.client.get(f'/questions/{self.q.id}')
+        self.assertContains(response, 'data-answers-url')
+        cursor = response.context['page_obj'].next_cursor
+        order = self.expected_order()
+        seen = []
+        while cursor:
+            with self.assertNumQueries(2):     # question and answers
+                data = self.client.get(f'/questions/{self.q.id}/answers',
+                                       {'cursor': cursor}).json()
+            seen.extend(
+                answer.content for answer in order
+                if f'<p>{answer.content}</p>' in data['html'])
+            self.assertNotIn('<html', data['html'])
+            cursor = data['next_cursor']
+        self.assertEqual(seen, [answer.content for answer in order[3:]])
+        self.assertEqual(
+            self.client.get('/questions/12345/answers').status_code, 404)
+
+
+class TestPageCache(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.alice = User.objects.create_user(
+            username='Alice',
+            email='alice@wonderland.com',
+            password='alicepass'
+        )
+        cls.q = Question.objects.create(
+            title='How to Django?', author=cls.sam,
+            content='Lorem ipsum dolor est')
+        cls.answer = Answer.objects.create(
+            author=cls.sam, question=cls.q, content='Dolor est')
+        cls.url = f'/questions/{cls.q.id}'
+
+    def setUp(self):
+        cache.clear()
+
+    def assertCached(self, url, cached=True):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(not context.captured_queries, cached)
+        return response
+
+    def test_anonymous_pages_are_cached(self):
+        for url in ('/questions/', '/questions/hot', self.url):
+            with self.subTest(url=url):
+                first = self.assertCached(url, cached=False)
+                second = self.assertCached(url)
+                self.assertEqual(first.content, second.content)
+        # every page of the answers has its own entry
+        self.assertCached(f'{self.url}?cursor=abc', cached=False)
+
+    def test_no_csrf_token_on_cached_pages(self):
+        '''
+        Search form is sent with GET, cached pages carry no token
+        '''
+        response = self.client.get('/questions/')
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+        self.assertContains(response, 'method="get"')
+        self.assertNotIn('csrftoken', response.cookies)
+
+    def test_members_are_not_served_from_cache(self):
+        self.client.get(self.url)
+        self.client.force_login(self.alice)
+        response = self.assertCached(self.url, cached=False)
+        self.assertContains(response, 'Alice')
+        self.assertCached(self.url, cached=False)
+
+    def test_question_vote_invalidates_page_and_lists(self):
+        self.client.get(self.url)
+        self.client.get('/questions/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.register_vote(self.q, self.alice.id, vote=1)
+        response = self.assertCached(self.url, cached=False)
+        self.assertEqual(response.context['question'].votes, 1)
+        self.assertCached('/questions/', cached=False)
+
+    def test_answer_vote_invalidates_question_page(self):
+        self.client.get(self.url)
+        self.client.get('/questions/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.register_vote(self.answer, self.alice.id, vote=1)
+        self.assertCached(self.url, cached=False)
+        self.assertCached('/questions/')
+
+    def test_new_answer_invalidates_page(self):
+        other = Question.objects.create(
+            title='Other question', author=self.sam, content='Lorem')
+        self.client.get(self.url)
+        self.client.get(f'/questions/{other.id}')
+        with self.captureOnCommitCallbacks(execute=True):
+            Answer.objects.create(author=self.alice, question=self.q,
+                                  content='Fresh answer')
+        response = self.assertCached(self.url, cached=False)
+        self.assertContains(response, 'Fresh answer')
+        # pages of other questions stay cached
+        self.assertCached(f'/questions/{other.id}')
+
+    def test_trending_sidebar_of_cached_pages(self):
+        '''
+        A vote on a trending question keeps other pages cached, their
+        sidebar shows the new votes
+        '''
+        other = Question.objects.create(
+            title='Other question', author=self.alice, content='Lorem')
+        url = f'/questions/{other.id}'
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.register_vote(self.q, self.alice.id, vote=1)
+        with self.assertNumQueries(1):      # trending questions only
+            response = self.client.get(url)
+        self.assertContains(response, 'disabled>1</button>', count=1)
+        self.assertEqual(self.assertCached(url).content, response.content)
+
+    def test_author_changes_invalidate_pages(self):
+        other = Question.objects.create(
+            title='Other question', author=self.alice, content='Lorem')
+        self.client.get(self.url)
+        self.client.get(f'/questions/{other.id}')
+        self.client.get('/questions/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.login(username='Sam', password='sampassword')
+            self.client.logout()
+        self.assertCached(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sam.profile.avatar = '/media/sam_avatar.png'
+            self.sam.profile.save(update_fields=['avatar'])
+        response = self.assertCached(self.url, cached=False)
+        self.assertContains(response, '/media/sam_avatar.png')
+        self.assertCached(f'/questions/{other.id}')
+        self.assertCached('/questions/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sam.username = 'Samuel'
+            self.sam.save()
+        self.assertContains(self.assertCached(self.url, cached=False),
+                            'Samuel')
+        self.assertCached('/questions/', cached=False)
+        self.assertCached(f'/questions/{other.id}')
+
+
 class TestMakeQuestion(TestCase):
 
     @classmethod
@@ -816,3 +1348,84 @@ class TestQuestionVoting(TestCase):
                         f'{self.alice_question.id}/{vote}'
                     ),
                     status_code=302, target_status_code=200)
+
+
+class TestVoteApi(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.alice = User.objects.create_user(
+            username='Alice',
+            email='alice@wonderland.com',
+            password='alicepass'
+        )
+        cls.bob = User.objects.create_user(
+            username='Bob',
+            email='bob@wonderland.com',
+            password='bobpass'
+        )
+        cls.alice_question = Question.objects.create(
+            title='How to Django?', author=cls.alice,
+            content='Lorem ipsum dolor est')
+        cls.alice_answer = Answer.objects.create(
+            author=cls.alice, question=cls.alice_question,
+            content='Lorem ipsum')
+
+    def vote(self, url, vote):
+        return self.client.post(url, {'vote': vote})
+
+    def test_vote_returns_score_and_state(self):
+        '''
+        Sam and Bob vote with POST requests and get the new score and
+        their own vote back
+        '''
+        for url in (f'/questions/questionvote/{self.alice_question.id}',
+                    f'/questions/answervote/{self.alice_answer.id}'):
+            with self.subTest(url=url):
+                self.client.force_login(self.sam)
+                response = self.vote(url, 1)
+                self.assertEqual(response.json(), {'votes': 1, 'vote': 1})
+                # second upvote is not counted
+                response = self.vote(url, 1)
+                self.assertEqual(response.json(), {'votes': 1, 'vote': 1})
+
+                self.client.force_login(self.bob)
+                self.assertEqual(self.vote(url, 0).json(),
+                                 {'votes': 0, 'vote': -1})
+                self.assertEqual(self.vote(url, 1).json(),
+                                 {'votes': 1, 'vote': 0})
+        self.alice_question.refresh_from_db()
+        self.alice_answer.refresh_from_db()
+        self.assertEqual(self.alice_question.votes, 1)
+        self.assertEqual(self.alice_answer.votes, 1)
+
+    def test_no_page_render(self):
+        self.client.force_login(self.sam)
+        with self.assertTemplateNotUsed('base.html'):
+            response = self.vote(
+                f'/questions/questionvote/{self.alice_question.id}', 1)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_refused_votes(self):
+        url = f'/questions/questionvote/{self.alice_question.id}'
+        self.assertEqual(self.vote(url, 1).status_code, 401)
+        self.client.force_login(self.alice)     # her own question
+        self.assertEqual(self.vote(url, 1).status_code, 403)
+        self.client.force_login(self.sam)
+        self.assertEqual(self.vote(url, 5).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(
+            self.vote('/questions/questionvote/12345', 1).status_code, 404)
+        self.alice_question.refresh_from_db()
+        self.assertEqual(self.alice_question.votes, 0)
+
+    def test_vote_script_for_members_only(self):
+        page = f'/questions/{self.alice_question.id}'
+        self.assertNotContains(self.client.get(page), 'X-CSRFToken')
+        self.client.force_login(self.sam)
+        self.assertContains(self.client.get(page), 'X-CSRFToken')
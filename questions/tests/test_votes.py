@@ -0,0 +1,114 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from questions.models import (Answer, AnswerVote, Question, QuestionVote,
+                              Vote)
+from questions.votes import vote_buffer
+
+
+@override_settings(VOTE_BUFFER=True, VOTE_FLUSH_INTERVAL=0)
+class TestVoteBuffer(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sam = User.objects.create_user(
+            username='Sam',
+            email='sam@pisem.net',
+            password='sampassword'
+        )
+        cls.alice = User.objects.create_user(
+            username='Alice',
+            email='alice@wonderland.com',
+            password='alicepass'
+        )
+        cls.bob = User.objects.create_user(
+            username='Bob',
+            email='bob@bobpost.org',
+            password='bobpass'
+        )
+        cls.qw = Question.objects.create(
+            title='How to Django?', author=cls.sam, content='Lorem ipsum')
+        cls.answer = Answer.objects.create(
+            author=cls.sam, question=cls.qw, content='Dolor est')
+
+    def setUp(self):
+        cache.clear()
+        vote_buffer.clear()
+
+    def vote(self, object, user, vote=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Vote.register_vote(object, user.id, vote=vote)
+
+    def test_counter_is_updated_on_flush(self):
+        '''
+        Votes are recorded at once, counters only when flushed
+        '''
+        self.assertTrue(self.vote(self.qw, self.alice))
+        self.assertTrue(self.vote(self.qw, self.bob))
+        self.assertTrue(self.vote(self.answer, self.bob, vote=0))
+        self.assertEqual(QuestionVote.objects.count(), 2)
+        self.assertEqual(AnswerVote.objects.count(), 1)
+        self.assertEqual(Question.objects.get(pk=self.qw.id).votes, 0)
+        self.assertEqual(vote_buffer.pending(self.qw), 2)
+
+        self.assertEqual(vote_buffer.flush(), 2)
+        self.assertEqual(Question.objects.get(pk=self.qw.id).votes, 2)
+        self.assertEqual(Answer.objects.get(pk=self.answer.id).votes, -1)
+        self.assertEqual(vote_buffer.pending(self.qw), 0)
+
+    def test_deltas_are_aggregated(self):
+        self.vote(self.qw, self.alice)
+        self.vote(self.qw, self.alice, vote=0)     # cancelled
+        self.vote(self.answer, self.alice)
+        self.vote(self.answer, self.bob)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(vote_buffer.flush(), 1)
+        # a single UPDATE for both votes of the answer
+        self.assertEqual(len([
+            query for query in context.captured_queries
+            if query['sql'].startswith('UPDATE')]), 1)
+        self.assertEqual(Answer.objects.get(pk=self.answer.id).votes, 2)
+        self.assertEqual(Question.objects.get(pk=self.qw.id).votes, 0)
+
+    def test_corridor_is_kept(self):
+        self.assertTrue(self.vote(self.qw, self.alice))
+        self.assertFalse(self.vote(self.qw, self.alice))
+        self.assertEqual(vote_buffer.pending(self.qw), 1)
+
+    def test_rolled_back_vote_is_not_buffered(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Vote.register_vote(self.qw, self.alice.id, vote=1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(vote_buffer), 0)
+
+    def test_failed_flush_keeps_deltas(self):
+        self.vote(self.qw, self.alice)
+        with patch.object(vote_buffer, '_update',
+                          side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                vote_buffer.flush()
+        self.assertEqual(vote_buffer.pending(self.qw), 1)
+        vote_buffer.flush()
+        self.assertEqual(Question.objects.get(pk=self.qw.id).votes, 1)
+
+    def test_own_vote_is_shown_before_flush(self):
+        self.vote(self.qw, self.alice)
+        self.client.force_login(self.alice)
+        response = self.client.get(f'/questions/{self.qw.id}')
+        self.assertEqual(response.context['question'].votes, 1)
+
+    def test_flush_invalidates_cached_page(self):
+        url = f'/questions/{self.qw.id}'
+        self.client.get(url)
+        self.vote(self.qw, self.alice)
+        with self.assertNumQueries(0):     # counter is not changed yet
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            vote_buffer.flush()
+        response = self.client.get(url)
+        self.assertEqual(response.context['question'].votes, 1)
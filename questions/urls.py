@@ -7,12 +7,21 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('hot', views.index_hot, name='hot'),
     path('search', views.index_search, name='search'),
+    path('suggest', views.suggest, name='suggest'),
+    path('suggest/tags', views.suggest_tags, name='suggest_tags'),
     path('<int:question_id>', views.show_question, name='question'),
+    path('<int:question_id>/answers', views.question_answers,
+         name='answers'),
     path('add', views.make_question, name='make_question'),
     path('tag/<int:tag_id>', views.search_tag, name='searchtag'),
+    path('tags', views.tag_directory, name='tags'),
     path('alterflag/<int:answer_id>', views.alter_flag, name='alterflag'),
     path('answervote/<int:answer_id>/<int:vote>', views.answer_vote,
          name='answervote'),
     path('questionvote/<int:question_id>/<int:vote>', views.question_vote,
-         name='questionvote')
+         name='questionvote'),
+    path('answervote/<int:answer_id>', views.answer_vote_json,
+         name='answervote_json'),
+    path('questionvote/<int:question_id>', views.question_vote_json,
+         name='questionvote_json'),
 ]
@@ -1,83 +1,195 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import HttpResponseRedirect
+from django.db import transaction
+from django.http import HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 
 from hasker.signals import question_answered
 from .forms import AnswerForm, QuestionForm
 from .helpers import save_tags
-from .models import Answer, Question, Tag, Voters
+from .models import Answer, Question, Tag, Vote
+from .page_cache import (LISTS_VERSION, cache_page_for_anonymous,
+                         question_version)
+from .pagination import (CursorPaginator, EstimatedCountPaginator,
+                         IdCursorPaginator, IdListPaginator)
+from .search import normalize_query, search_question_ids
+from .search.suggest import suggestions
+from .search.tag_suggest import tag_model
+from .search.tags import contains, parse_tag_query, tag_query_ids
+from .votes import vote_buffer
 
 num_pages = settings.ELEMENTS_PER_PAGE  # pagination constant
+# answers on the question page, see answer_page_idx
+ANSWER_ORDERING = ('-votes', '-created_on', '-id')
 
 
+@cache_page_for_anonymous(LISTS_VERSION)
 def index(request, pages=num_pages):
-    queryset = Question.objects.all().order_by('-created_on', 'title')
-    paginator = Paginator(queryset, pages)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    queryset = Question.objects.listing()
+    paginator = CursorPaginator(queryset, pages,
+                                ordering=('-created_on', 'title'))
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     context = {'page_obj': page_obj}
     return render(request, 'questions/index.html', context)
 
 
+@cache_page_for_anonymous(LISTS_VERSION)
 def index_hot(request, pages=num_pages):
-    queryset = Question.objects.all().order_by('-votes', 'title')
-    paginator = Paginator(queryset, pages)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    queryset = Question.objects.listing()
+    paginator = CursorPaginator(queryset, pages,
+                                ordering=('-hot_score', 'title'))
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     context = {'page_obj': page_obj}
     return render(request, 'questions/hot_questions.html', context)
 
 
-def search_tag(request, tag_id, pages=num_pages):
+@cache_page_for_anonymous(LISTS_VERSION)
+def search_tag(request, tag_id, pages=num_pages, page_query=''):
+    """
+    Questions with the tag. page_query is kept in the page links when
+    the tag has been searched for with "tag:name" (see index_search)
+    """
     tag = Tag.objects.get(id=tag_id)
-    queryset = tag.questions.all()
-    paginator = Paginator(queryset, pages)
+    queryset = tag.questions.listing().order_by('-created_on', 'title')
+    paginator = EstimatedCountPaginator(queryset, pages)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     context = {
         'page_obj': page_obj,
+        'page_query': page_query,
         'tag': tag
     }
     return render(request, 'questions/tag.html', context)
 
 
+TAG_ORDERINGS = {
+    'popular': ('Popular', ('-question_count', 'title')),
+    'recent': ('Recent', ('-last_activity', 'title')),
+    'name': ('Name', ('title',)),
+}
+
+
+def tag_directory(request, pages=num_pages):
+    """
+    Browse tags by popularity, recent activity or name
+    """
+    sort = request.GET.get('sort')
+    if sort not in TAG_ORDERINGS:
+        sort = 'popular'
+    paginator = CursorPaginator(Tag.objects.all(), pages,
+                                ordering=TAG_ORDERINGS[sort][1])
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    context = {
+        'page_obj': page_obj,
+        'sort': sort,
+        'sort_options': [
+            (name, label) for name, (label, _) in TAG_ORDERINGS.items()
+        ],
+        'page_query': urlencode({'sort': sort}) + '&',
+    }
+    return render(request, 'questions/tags.html', context)
+
+
 def index_search(request, pages=num_pages):
     """
-    Search question by search phrase or by tag
+    Search question by search phrase or by tags:
+    "tag:python tag:django -tag:flask", optionally with words
     """
-    search: str = request.POST.get('search', None)
-    if search.startswith('tag:'):
-        tag_name = search[4:].strip()
-        try:
-            tag = Tag.objects.get(title=tag_name)
-        except Tag.DoesNotExist:
+    search: str = request.GET.get('search') or request.POST.get('search', '')
+    search = search.strip()
+    query = normalize_query(search)
+    include, exclude, words = parse_tag_query(query)
+    page_query = urlencode({'search': search}) + '&'
+    if len(include) == 1 and not exclude and not words:
+        tag_name = include[0]
+        tag = Tag.objects.filter(title__iexact=tag_name).first()
+        if tag is None:
             context = {'error_message': f'No tag {tag_name} found'}
             return render(request, 'questions/search.html', context)
-        return search_tag(request, tag_id=tag.id)
-
-    queryset = Question.objects.select_related().filter(
-            Q(title__icontains=search)
-          | Q(content__icontains=search)                        # noqa E131
-          | Q(answer__content__icontains=search)                # noqa E131
-        ).distinct().order_by('-votes', '-created_on')
-    paginator = Paginator(queryset, pages)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        return search_tag(request, tag_id=tag.id, page_query=page_query)
+
     context = {
-        'page_obj': page_obj,
+        'page_query': page_query,
         'searchstring': search
     }
+    if exclude and not include:
+        context['error_message'] = 'Which tags to search for?'
+        return render(request, 'questions/search.html', context)
+    if include:
+        tagged = tag_query_ids(include, exclude)
+        if not words:
+            paginator = IdCursorPaginator(tagged, pages,
+                                          Question.objects.listing())
+            context['page_obj'] = paginator.get_page(
+                request.GET.get('cursor'))
+            return render(request, 'questions/search.html', context)
+        ids = [
+            qw_id for qw_id in search_question_ids(words)
+            if contains(tagged, qw_id)
+        ]
+    else:
+        ids = search_question_ids(query)
+    paginator = IdListPaginator(ids, pages, Question.objects.listing())
+    page_number = request.GET.get('page')
+    context['page_obj'] = paginator.get_page(page_number)
     return render(request, 'questions/search.html', context)
 
 
+def suggest(request):
+    """
+    Question and tag titles starting with the ?q= prefix as JSON,
+    for search-as-you-type
+    """
+    try:
+        limit = int(request.GET.get('limit', settings.SUGGEST_LIMIT))
+    except ValueError:
+        limit = settings.SUGGEST_LIMIT
+    limit = max(1, min(limit, settings.SUGGEST_LIMIT))
+    found = suggestions.lookup(request.GET.get('q', ''), limit)
+    return JsonResponse({
+        'questions': [
+            {'id': qw_id, 'title': title,
+             'url': reverse('questions:question', args=[qw_id])}
+            for qw_id, title in found.get('question', [])
+        ],
+        'tags': [
+            {'id': tag_id, 'title': title,
+             'url': reverse('questions:searchtag', args=[tag_id])}
+            for tag_id, title in found.get('tag', [])
+        ],
+    })
+
+
+def suggest_tags(request):
+    """
+    Tags to add to a new question given its ?title= and the ?tags=
+    entered so far, as JSON
+    """
+    tags = request.GET.get('tags', '').split()
+    title = request.GET.get('title', '')
+    return JsonResponse({
+        'tags': tag_model.suggest(tags, title, settings.TAG_SUGGEST_LIMIT)
+    })
+
+
+@cache_page_for_anonymous(
+    lambda question_id, **kwargs: question_version(question_id))
 def show_question(request, question_id):
     """
     Show question page or post a new answer for a question
     """
-    qw = get_object_or_404(Question, pk=question_id)
+    # the page costs a fixed number of queries whatever the number of
+    # answers: question with author and profile, tags, answers with
+    # authors and profiles, votes of the viewer
+    qw = get_object_or_404(Question.objects.detail(), pk=question_id)
+    if settings.VOTE_BUFFER:
+        # votes buffered by this process are shown before the flush
+        qw.votes += vote_buffer.pending(qw)
     context = {'question': qw}
     if request.method == 'POST':
         if not request.user.is_authenticated:
@@ -85,21 +197,60 @@ def show_question(request, question_id):
         form = AnswerForm(request.POST, question_id=question_id)
         if form.is_valid():
             content = form.cleaned_data.get('content')
-            answer = Answer(author=request.user, question=qw,
-                            content=content)
-            answer.save()
+            with transaction.atomic():
+                # answer counter of the question is updated on save
+                answer = Answer(author=request.user, question=qw,
+                                content=content)
+                answer.save()
             # send a signal about new answer
             question_answered.send(sender=show_question, question=qw)
     else:
         form = AnswerForm()
 
-    answer_query = Answer.objects.filter(question=question_id).order_by(
-        '-votes', '-answer_flag', '-created_on')
-    tags = Tag.objects.filter(questions=question_id)
-    context.update({'answer_query': answer_query, 'tags': tags, 'form': form})
+    page_obj, answer_query = _answer_page(qw, request.GET.get('cursor'))
+    # how the viewer voted, to highlight the arrows
+    question_vote, answer_votes = Vote.user_votes(
+        request.user, qw, answer_query)
+    tags = qw.get_tags()
+    context.update({'answer_query': answer_query, 'page_obj': page_obj,
+                    'tags': tags, 'form': form,
+                    'question_vote': question_vote,
+                    'answer_votes': answer_votes})
     return render(request, 'questions/question.html', context)
 
 
+def _answer_page(qw, cursor):
+    """
+    Return (page, answers) for a page of answers to the question, best
+    voted first. The accepted answer is pinned on top of the first page
+    and is left out of the others.
+    """
+    paginator = CursorPaginator(
+        Answer.objects.detail().filter(question=qw, answer_flag=0),
+        settings.ANSWERS_PER_PAGE, ordering=ANSWER_ORDERING)
+    page = paginator.get_page(cursor)
+    answers = list(page)
+    if not page.has_previous() and qw.status == 1:
+        answers[:0] = Answer.objects.detail().filter(
+            question=qw, answer_flag=1)[:1]
+    return page, answers
+
+
+def question_answers(request, question_id):
+    """
+    Further answers to a question for endless scrolling: JSON with the
+    rendered answer cards and the cursor of the next page
+    """
+    qw = get_object_or_404(Question.objects.only('id', 'status'),
+                           pk=question_id)
+    page, answers = _answer_page(qw, request.GET.get('cursor'))
+    _, answer_votes = Vote.user_votes(request.user, qw, answers)
+    html = render_to_string('questions/answers.html', {
+        'answers': answers, 'answer_votes': answer_votes,
+    }, request=request)
+    return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
+
+
 @login_required
 def make_question(request):
     """
@@ -117,8 +268,9 @@ def make_question(request):
                 title=title,
                 content=content
             )
-            question.save()
-            save_tags(tags, question, Tag)
+            with transaction.atomic():
+                question.save()
+                save_tags(tags, question, Tag)
             return redirect('questions:question', question_id=question.id)
     else:
         form = QuestionForm()
@@ -163,8 +315,8 @@ def answer_vote(request, answer_id, vote=1):
         # user cannot vote for his own answers
         return HttpResponseRedirect(request.META['HTTP_REFERER'])
 
-    Voters.register_vote(object=answer, user_id=request.user.id,
-                         vote=vote)
+    Vote.register_vote(object=answer, user_id=request.user.id,
+                       vote=vote)
     return HttpResponseRedirect(request.META['HTTP_REFERER'])
 
 
@@ -178,6 +330,50 @@ def question_vote(request, question_id, vote=1):
         # user cannot vote for his own questions
         return HttpResponseRedirect(request.META['HTTP_REFERER'])
 
-    Voters.register_vote(object=qw, user_id=request.user.id,
-                         vote=vote)
+    Vote.register_vote(object=qw, user_id=request.user.id,
+                       vote=vote)
     return HttpResponseRedirect(request.META['HTTP_REFERER'])
+
+
+def _vote_json(request, object):
+    """
+    Register the vote posted for a question or an answer and answer
+    with its new score and the vote of the user, as JSON.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Please log in to vote',
+                             'login_url': settings.LOGIN_URL}, status=401)
+    if object.author_id == request.user.id:
+        return JsonResponse({'error': 'You cannot vote for yourself'},
+                            status=403)
+    vote = request.POST.get('vote')
+    if vote not in ('0', '1'):
+        return JsonResponse({'error': 'Vote must be 1 or 0'}, status=400)
+
+    stored_votes = object.votes
+    user_vote = Vote.cast_vote(object, request.user.id, int(vote))
+    if user_vote is None:
+        # nowhere to move: the user has already voted that way
+        user_vote = 1 if vote == '1' else -1
+    votes = object.votes
+    if settings.VOTE_BUFFER:
+        votes = stored_votes + vote_buffer.pending(object)
+    return JsonResponse({'votes': votes, 'vote': user_vote})
+
+
+@require_POST
+def answer_vote_json(request, answer_id):
+    """
+    Upvote (vote=1) or downvote (vote=0) an answer, answer with JSON
+    """
+    answer = get_object_or_404(Answer, pk=answer_id)
+    return _vote_json(request, answer)
+
+
+@require_POST
+def question_vote_json(request, question_id):
+    """
+    Upvote (vote=1) or downvote (vote=0) a question, answer with JSON
+    """
+    qw = get_object_or_404(Question, pk=question_id)
+    return _vote_json(request, qw)
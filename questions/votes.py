@@ -0,0 +1,144 @@
+"""
+Write-behind buffer of vote counters (settings.VOTE_BUFFER).
+
+Under a voting spike every vote for a question serializes on the lock
+of its row. In buffered mode register_vote() only upserts the vote
+row of the user, which is the durable record of the vote and does not
+contend with other voters, and the counter delta is aggregated here.
+Every settings.VOTE_FLUSH_INTERVAL milliseconds the deltas are flushed
+with a few batched UPDATEs, one per model and delta value.
+
+Each worker process has its own buffer. Deltas of a process which dies
+before flushing are lost, while the votes themselves are kept: counters
+can be recounted from QuestionVote and AnswerVote.
+"""
+import atexit
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Question
+from .page_cache import pages_changed
+
+BATCH_SIZE = 500    # ids per UPDATE statement
+
+
+class VoteBuffer:
+
+    def __init__(self):
+        self._deltas = defaultdict(int)     # (model, pk) -> votes delta
+        self._objects = {}                  # (model, pk) -> last instance
+        self._lock = threading.Lock()
+        self._timer = None
+        self._exit_hook = False
+
+    def add(self, object, delta):
+        """
+        Count a vote for a Question or Answer instance.
+        """
+        key = (type(object), object.pk)
+        with self._lock:
+            self._deltas[key] += delta
+            self._objects[key] = object
+            self._schedule()
+
+    def pending(self, object) -> int:
+        """
+        Votes delta of the object not flushed yet by this process.
+        """
+        with self._lock:
+            return self._deltas.get((type(object), object.pk), 0)
+
+    def __len__(self):
+        return len(self._deltas)
+
+    def clear(self):
+        """
+        Drop buffered deltas without applying them.
+        """
+        with self._lock:
+            self._deltas.clear()
+            self._objects.clear()
+
+    def _schedule(self):
+        if not self._exit_hook:
+            atexit.register(self.flush)
+            self._exit_hook = True
+        interval = settings.VOTE_FLUSH_INTERVAL
+        if self._timer is None and interval:
+            self._timer = threading.Timer(interval / 1000,
+                                          self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except DatabaseError:
+            pass    # deltas are back in the buffer, retried later
+        finally:
+            connection.close()      # the timer thread's own connection
+
+    def flush(self) -> int:
+        """
+        Apply buffered deltas to the votes columns. Return number of
+        updated objects. On database errors the deltas are put back.
+        """
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(int)
+            objects, self._objects = self._objects, {}
+            self._timer = None
+        changes = defaultdict(lambda: defaultdict(list))
+        for (model, pk), delta in deltas.items():
+            if delta:
+                changes[model][delta].append(pk)
+        if not changes:
+            return 0    # e.g. at exit, no connection is opened
+        try:
+            with transaction.atomic():
+                for model, pks_by_delta in changes.items():
+                    for delta, pks in pks_by_delta.items():
+                        self._update(model, delta, pks)
+        except DatabaseError:
+            with self._lock:
+                for key, delta in deltas.items():
+                    self._deltas[key] += delta
+                    self._objects.setdefault(key, objects[key])
+                self._schedule()
+            raise
+        for (model, pk), object in objects.items():
+            if model is Question and deltas[(model, pk)]:
+                Question.refresh_trending(object)
+        return sum(len(pks) for pks_by_delta in changes.values()
+                   for pks in pks_by_delta.values())
+
+    @staticmethod
+    def _update(model, delta, pks):
+        add_votes(model, delta, pks)
+
+
+def add_votes(model, delta, pks):
+    """
+    Add delta to the votes of Question or Answer objects with batched
+    UPDATEs, questions are marked to be rescored. Cached pages showing
+    the objects are invalidated after commit.
+    """
+    fields = {'votes': F('votes') + delta}
+    if model is Question:
+        fields['touched_on'] = timezone.now()
+    pks = sorted(pks)   # same lock order in every process
+    for start in range(0, len(pks), BATCH_SIZE):
+        batch = model.objects.filter(pk__in=pks[start:start + BATCH_SIZE])
+        batch.update(**fields)
+        if model is Question:
+            pages_changed(pks[start:start + BATCH_SIZE])
+        else:
+            pages_changed(set(batch.values_list('question_id', flat=True)),
+                          lists=False)
+
+
+vote_buffer = VoteBuffer()
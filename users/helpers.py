@@ -8,14 +8,14 @@ def save_avatar(request, avatar):
         avatar
         )
     request.user.profile.avatar = fss.url(file)
-    request.user.profile.save()
+    request.user.profile.save(update_fields=['avatar'])
 
 
 def update_email(request, email: str) -> bool:
     if email == request.user.email:
         return False
     request.user.email = email
-    request.user.save()
+    request.user.save(update_fields=['email'])
     return True
 
 
@@ -23,5 +23,5 @@ def update_alerts(request, alerts: bool) -> bool:
     if request.user.profile.send_email == alerts:
         return False
     request.user.profile.send_email = alerts
-    request.user.profile.save()
+    request.user.profile.save(update_fields=['send_email'])
     return True
@@ -15,5 +15,6 @@ class Profile(models.Model):
             Profile.objects.create(user=instance)
 
     @receiver(post_save, sender=User)
-    def save_user_profile(sender, instance, **kwargs):
-        instance.profile.save()
+    def save_user_profile(sender, instance, update_fields=None, **kwargs):
+        if update_fields is None:   # not on every login
+            instance.profile.save()